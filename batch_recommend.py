@@ -0,0 +1,183 @@
+# 헤드리스 일괄 추천: 냉장고 요청 JSONL을 한 줄씩 읽어서 추천 결과를 JSONL로 흘려 씁니다
+# 실행 예: python batch_recommend.py requests.jsonl -o results.jsonl --recipes recipes.csv --workers 4
+#
+# 입력 한 줄: {"id": "house-1", "pantry": ["김치", "목살"], "excluded": ["라면"], "k": 3}
+# 출력 한 줄: {"id": "house-1", "recommendations": [{"name": ..., "score": ..., "missing": [...]}]}
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from recipe_engine import IngredientMatcher, RecipeIndex, RecipeMatrix, missing_ingredients, normalize_pantry
+from recipe_storage import RECIPE_COLUMNS, read_recipe_snapshot
+
+_index = None
+_matrix = None
+
+
+def load_recipes(path):
+    # 앱이 남긴 열 스냅샷(.arrow)은 재료 전처리가 끝난 상태라 가장 빨리 뜹니다
+    if path.endswith(".arrow"): return read_recipe_snapshot(path)
+    if path.endswith((".sqlite", ".db")):
+        conn = sqlite3.connect(path)
+        try:
+            cur = conn.execute("SELECT * FROM recipes ORDER BY id")
+            names = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        finally:
+            conn.close()
+        return [{c: (r[names.index(c)] if c in names else "") for c in RECIPE_COLUMNS} for r in rows]
+    with open(path, encoding="utf-8", newline="") as f:
+        return [{c: row.get(c) or "" for c in RECIPE_COLUMNS} for row in csv.DictReader(f)]
+
+
+def init_worker(recipes_path):
+    # 워커마다 레시피 표는 한 번만 읽고 색인합니다
+    global _index, _matrix
+    _index = RecipeIndex(load_recipes(recipes_path))
+    _matrix = RecipeMatrix(_index)
+
+
+def rank_chunk(chunk, default_k):
+    results = [None] * len(chunk)
+    # 제외 목록이 없는 요청은 같은 k끼리 모아서 행렬 곱 한 번으로 채점합니다
+    batches = {}
+    for pos, (line_no, req) in enumerate(chunk):
+        if "error" in req:
+            results[pos] = {"line": line_no, "error": req["error"]}
+            continue
+        pantry_set = normalize_pantry(req.get("pantry") or [])
+        k = req.get("k") or default_k
+        if req.get("excluded"):
+            results[pos] = (pantry_set, _index.top_k(pantry_set, k=k, excluded=req["excluded"]))
+        else:
+            batches.setdefault(k, []).append((pos, pantry_set))
+    for k, items in batches.items():
+        ranked = _matrix.top_k_many([p for _, p in items], k=k)
+        for (pos, pantry_set), top in zip(items, ranked):
+            results[pos] = (pantry_set, top)
+
+    out = []
+    for (line_no, req), result in zip(chunk, results):
+        if isinstance(result, dict):
+            out.append(result)
+            continue
+        pantry_set, top = result
+        matcher = IngredientMatcher(pantry_set)
+        out.append({
+            "id": req.get("id", line_no),
+            "recommendations": [
+                {"name": recipe["요리명"], "score": score, "missing": missing_ingredients(recipe, matcher)}
+                for recipe, score in top
+            ],
+        })
+    return out
+
+
+def validate_request(req):
+    # 잘못된 줄 하나가 워커에서 터져 전체 배치를 멈추지 않도록 읽을 때 미리 거릅니다
+    if not isinstance(req, dict): raise ValueError("JSON 객체가 아닙니다")
+    for field in ("pantry", "excluded"):
+        value = req.get(field)
+        if value is not None and not (isinstance(value, list) and all(isinstance(x, str) for x in value)):
+            raise ValueError(f"{field}는 문자열 목록이어야 합니다")
+    k = req.get("k")
+    if k is not None and (isinstance(k, bool) or not isinstance(k, int) or k < 1):
+        raise ValueError("k는 1 이상의 정수여야 합니다")
+
+
+def read_requests(stream):
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip(): continue
+        try:
+            req = json.loads(line)
+            validate_request(req)
+        except ValueError as e:
+            req = {"error": f"잘못된 요청: {e}"}
+        yield line_no, req
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk: return
+        yield chunk
+
+
+def add_blurbs(records, client, model_name):
+    # 선택 단계: 1순위 추천마다 Gemini 멘트를 동시에 생성 (실패하면 기본 멘트)
+    from recipe_ai import generate_blurb
+
+    targets = [r for r in records if r.get("recommendations")]
+    futures = [
+        client.submit(generate_blurb(client, model_name, r["recommendations"][0]["name"], r["recommendations"][0]["missing"]))
+        for r in targets
+    ]
+    for record, future in zip(targets, futures):
+        try:
+            reason = future.result()["recommendations"][0]["reason"]
+        except Exception:
+            reason = "재료 조합상 현재 가장 해먹기 좋은 메뉴입니다! 😋"
+        record["recommendations"][0]["reason"] = reason
+
+
+def run(args, out):
+    chunks = chunked(read_requests(args.input), args.chunk_size)
+    client = None
+    if args.ai:
+        import google.generativeai as genai
+        from recipe_ai import AsyncGeminiClient
+
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        client = AsyncGeminiClient()
+
+    def emit(records):
+        if client is not None: add_blurbs(records, client, args.model)
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    if args.workers <= 1:
+        init_worker(args.recipes)
+        for chunk in chunks:
+            emit(rank_chunk(chunk, args.k))
+        return
+
+    # 처리 중인 청크 수를 워커 수의 2배로 묶어 두어 입력이 아무리 커도 메모리가 일정합니다
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(args.recipes,)) as pool:
+        window = deque()
+        for chunk in chunks:
+            window.append(pool.submit(rank_chunk, chunk, args.k))
+            if len(window) >= 2 * args.workers:
+                emit(window.popleft().result())
+        while window:
+            emit(window.popleft().result())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="냉장고 요청 JSONL로 레시피 추천을 일괄 계산합니다")
+    parser.add_argument("input", type=argparse.FileType("r", encoding="utf-8"), help="요청 JSONL 파일 ('-'이면 표준 입력)")
+    parser.add_argument("-o", "--output", default="-", help="결과 JSONL 파일 (기본: 표준 출력)")
+    parser.add_argument("--recipes", default="recipes.csv", help="레시피 CSV, SQLite 또는 열 스냅샷(.arrow) 파일")
+    parser.add_argument("-k", type=int, default=3, help="요청마다 추천할 개수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--ai", action="store_true", help="1순위 추천에 Gemini 멘트 추가 (GEMINI_API_KEY 필요)")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    args = parser.parse_args(argv)
+
+    if args.output == "-":
+        run(args, sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            run(args, out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# 엔진 벤치마크: 합성 레시피북 크기별로 처리량, p50/p99 지연, 최대 메모리를 재고 저장된 기준값과 비교
+# 실행 예:
+#   python benchmarks/bench_engine.py                      # 1k, 10k 행으로 측정 후 기준값과 비교
+#   python benchmarks/bench_engine.py --sizes 1000 1000000 # 원하는 크기로
+#   python benchmarks/bench_engine.py --save               # 현재 결과를 기준값으로 저장
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import Future
+from itertools import cycle, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from corpus import generate_pantries, generate_recipes
+from recipe_ai import get_ai_recommendations
+from recipe_engine import IngredientMatcher, RecipeIndex, SimilarityIndex, check_is_present, clean_ingredient_text, format_steps, normalize_pantry, score_recipe
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "bench_engine.json")
+MAX_CALLS = 20000
+RECOMMEND_CALLS = 200
+
+# google.generativeai가 import될 때 띄우는 지원 종료 경고가 표를 깨뜨리지 않도록
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+
+class StubBlurbs:
+    # Gemini 대신 바로 끝나는 Future를 돌려주는 멘트 서비스 (순위 계산 경로만 잽니다)
+    class client:
+        timeout = 20
+
+    def request(self, model_name, recipe_name, missing_items):
+        future = Future()
+        future.set_result({"recommendations": [{"name": recipe_name, "reason": "벤치마크", "missing": ""}]})
+        return future
+
+    def prefetch(self, model_name, recipe_name, missing_items):
+        pass
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(fn, args_list, rounds=3):
+    fn(*args_list[0])  # 워밍업 (지연 import 등)
+    # 처리량은 가장 빠른 회차, 지연 분위수는 전체 회차를 합쳐서 계산합니다
+    latencies, best = [], float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for args in args_list:
+            t0 = time.perf_counter_ns()
+            fn(*args)
+            latencies.append(time.perf_counter_ns() - t0)
+        best = min(best, time.perf_counter() - start)
+    latencies.sort()
+
+    # 메모리는 tracemalloc 때문에 느려지므로 따로 한 번 더 돌려서 잽니다
+    tracemalloc.start()
+    for args in args_list: fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "calls": len(args_list),
+        "ops_per_sec": len(args_list) / best,
+        "p50_us": percentile(latencies, 0.50) / 1000,
+        "p99_us": percentile(latencies, 0.99) / 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def measure_once(fn, rounds=3):
+    seconds = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"calls": 1, "ops_per_sec": 1 / seconds, "p50_us": seconds * 1e6, "p99_us": seconds * 1e6, "peak_kb": peak / 1024}
+
+
+def run_size(size, seed=0):
+    recipes = list(generate_recipes(size, seed))
+    pantries = list(generate_pantries(RECOMMEND_CALLS, seed))
+    pantry_set = normalize_pantry(pantries[0])
+    matcher = IngredientMatcher(pantry_set)
+    ingredients = [x for r in islice(cycle(recipes), MAX_CALLS // 5 + 1) for x in r["필수재료"].split(",")][:MAX_CALLS]
+    sample = list(islice(cycle(recipes), min(size, MAX_CALLS)))
+
+    results = {
+        "clean_ingredient_text": measure(clean_ingredient_text, [(x,) for x in ingredients]),
+        "check_is_present": measure(check_is_present, [(x, pantry_set) for x in ingredients]),
+        "score_recipe": measure(score_recipe, [(pantry_set, r, matcher) for r in sample]),
+        "format_steps": measure(format_steps, [(r["조리법"],) for r in sample]),
+        "RecipeIndex(build)": measure_once(lambda: RecipeIndex(recipes)),
+    }
+    index = RecipeIndex(recipes)
+    results["SimilarityIndex(build)"] = measure_once(lambda: SimilarityIndex(index))
+    similarity = index.similarity()
+    results["similar_recipes"] = measure(similarity.similar_recipes, [(r,) for r in sample[:RECOMMEND_CALLS]])
+    results["similar_to_pantry"] = measure(similarity.similar_to_pantry, [(normalize_pantry(p),) for p in pantries])
+    blurbs = StubBlurbs()
+    results["get_ai_recommendations"] = measure(
+        lambda pantry: get_ai_recommendations("bench", pantry, recipes, [], index, blurbs=blurbs, k=3),
+        [(p,) for p in pantries],
+    )
+    return results
+
+
+def speedup(current, baseline):
+    # 1보다 크면 빨라진 것. 튀는 값에 덜 흔들리도록 p50 기준으로 비교합니다
+    return baseline["p50_us"] / current["p50_us"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="레시피 엔진 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--threshold", type=float, default=0.25, help="p50 기준으로 이 비율 이상 느려지면 실패로 종료")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f: baseline = json.load(f)["results"]
+
+    all_results, regressions = {}, []
+    print(f"{'rows':>8}  {'benchmark':<24}{'ops/s':>12}{'p50 us':>10}{'p99 us':>10}{'peak KB':>10}{'vs base':>10}")
+    for size in args.sizes:
+        results = all_results[str(size)] = run_size(size, args.seed)
+        for name, r in results.items():
+            base = baseline.get(str(size), {}).get(name)
+            print(f"{size:>8}  {name:<24}{r['ops_per_sec']:>12.1f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['peak_kb']:>10.0f}{f'{speedup(r, base):.2f}x' if base else '':>10}")
+            if base and speedup(r, base) < 1 - args.threshold:
+                regressions.append(f"{size}/{name}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        merged = {**baseline, **all_results}
+        meta = {"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": merged}, f, ensure_ascii=False, indent=2)
+        print(f"기준값 저장: {BASELINE_PATH}")
+    elif regressions:
+        print("느려진 항목:", ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# 사진 전처리 벤치마크: 기존 경로(원본 PIL 이미지를 그대로 전송) vs preprocess_image
+# 실행: python benchmarks/bench_image_preprocess.py [사진 파일 ...]
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+from google.generativeai.types import content_types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recipe_ai import preprocess_image
+
+
+def synthetic_photo(width=4032, height=3024, seed=0):
+    # 폰 카메라 사진 크기의 JPEG (노이즈 + 그라데이션, EXIF 회전 태그 포함)
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(gradient + rng.normal(0, 40, (height, width, 3)), 0, 255).astype(np.uint8)
+    img = Image.fromarray(pixels)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 90도 회전
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=92, exif=exif)
+    return out.getvalue()
+
+
+def current_path(data):
+    # 기존 코드: Image.open(업로드 파일) → SDK가 원본 해상도 그대로 무손실 WebP로 변환
+    blob = content_types.to_blob(Image.open(io.BytesIO(data)))
+    return len(blob.data)
+
+
+def new_path(data):
+    return len(preprocess_image(data)["data"])
+
+
+def measure(fn, data, repeat=3):
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn(data)
+        best = min(best, time.perf_counter() - start)
+    return size, best
+
+
+def main(paths):
+    samples = [(p, open(p, "rb").read()) for p in paths] or [("synthetic 4032x3024", synthetic_photo())]
+    print(f"{'sample':<28}{'path':<10}{'input KB':>10}{'sent KB':>10}{'ms':>10}")
+    for name, data in samples:
+        for label, fn in (("current", current_path), ("new", new_path)):
+            size, seconds = measure(fn, data)
+            print(f"{name[:27]:<28}{label:<10}{len(data) / 1024:>10.0f}{size / 1024:>10.0f}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
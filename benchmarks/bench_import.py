@@ -0,0 +1,40 @@
+# import 시간 벤치마크: 모듈마다 새 파이썬 프로세스에서 import만 해 보고, 무거운 SDK가 같이 딸려오는지 확인
+# 실행: python benchmarks/bench_import.py [모듈 ...]
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["recipe_engine", "recipe_storage", "recipe_ai", "batch_recommend"]
+HEAVY = ["numpy", "pandas", "PIL", "gspread", "google.generativeai", "streamlit"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure(module, repeat=5):
+    best, loaded = float("inf"), ""
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.split(" ", 1)
+        best = min(best, float(out[0]))
+        loaded = out[1].strip()
+    return best, loaded
+
+
+def main(modules):
+    print(f"{'module':<20}{'ms':>10}  heavy modules loaded")
+    for module in modules or MODULES:
+        seconds, loaded = measure(module)
+        print(f"{module:<20}{seconds * 1000:>10.1f}  {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
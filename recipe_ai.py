@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, as_completed, TimeoutError as FuturesTimeoutError
+
+from recipe_engine import IngredientMatcher, RecipeIndex, normalize_pantry, missing_ingredients, format_missing
+from recipe_trace import tracer
+
+# google.generativeai(import에 1초 이상)와 PIL은 실제로 호출할 때만 불러옵니다
+
+# --- 비동기 Gemini 클라이언트 (동시 호출 수 제한 + 분당 요청 수 제한 + 호출별 마감 시간) ---
+class AsyncRateLimiter:
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.calls = deque()
+
+    async def acquire(self):
+        while True:
+            now = self.clock()
+            while self.calls and now - self.calls[0] >= 60: self.calls.popleft()
+            if len(self.calls) < self.per_minute:
+                self.calls.append(now)
+                return
+            await asyncio.sleep(60 - (now - self.calls[0]))
+
+class AsyncGeminiClient:
+    def __init__(self, max_concurrency=4, requests_per_minute=15, timeout=20):
+        self.max_concurrency = max_concurrency
+        self.limiter = AsyncRateLimiter(requests_per_minute)
+        self.timeout = timeout
+        self.semaphore = None
+        # gRPC 비동기 채널은 이벤트 루프에 묶이므로, 루프 하나를 전용 스레드에서 계속 돌립니다
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="gemini-loop", daemon=True).start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def generate(self, model_name, contents, generation_config=None, timeout=None):
+        if self.semaphore is None: self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            await self.limiter.acquire()
+            import google.generativeai as genai
+            tracer.count("gemini.calls")
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            response = await asyncio.wait_for(model.generate_content_async(contents), timeout or self.timeout)
+            return response.text
+
+# --- AI 추천 멘트 생성 ---
+GEMINI_MODEL = "gemini-2.5-flash"
+
+async def generate_blurb(client, model_name, recipe_name, missing_items):
+    missing_text = format_missing(missing_items)
+    prompt = f"""
+    너는 긍정적인 요리 친구야.
+    추천 메뉴: {recipe_name}
+    부족한 재료: {missing_text}
+    이 요리를 추천하는 이유를 한 문장으로 긍정적으로 말해줘.
+    출력 형식(JSON):
+    {{ "recommendations": [ {{ "name": "{recipe_name}", "reason": "AI의 추천 멘트", "missing": "{missing_text}" }} ] }}
+    """
+    text = await client.generate(model_name, prompt)
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match: return json.loads(match.group(0))
+    else: raise ValueError("No JSON")
+
+# --- JSON 디스크 캐시 (LRU + TTL, AI 응답 재사용) ---
+class JsonDiskCache:
+    def __init__(self, path, max_entries=1000, ttl=7 * 24 * 3600, clock=time.time):
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_used ON entries(used_at)")
+
+    def get(self, key):
+        now = self.clock()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            if now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def put(self, key, value):
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, json.dumps(value, ensure_ascii=False), now, now))
+            # 가장 오래 안 쓴 항목부터 정리
+            self.conn.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def contains(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and self.clock() - row[0] <= self.ttl
+
+# --- 사진 전처리 (EXIF 회전 보정 + 긴 변 축소 + JPEG 재압축) ---
+IMAGE_MAX_EDGE = 1536
+IMAGE_QUALITY = 85
+
+def preprocess_image(data, max_edge=IMAGE_MAX_EDGE, quality=IMAGE_QUALITY):
+    from PIL import Image, ImageOps
+    img = Image.open(io.BytesIO(data))
+    # JPEG는 draft로 축소된 크기로 바로 디코딩해서 원본 해상도 전체를 풀지 않습니다
+    img.draft("RGB", (max_edge, max_edge))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return {"mime_type": "image/jpeg", "data": out.getvalue()}
+
+def image_set_key(model_name, images):
+    digest = hashlib.sha256(model_name.encode())
+    for blob in images:
+        digest.update(hashlib.sha256(blob["data"]).digest())
+    return digest.hexdigest()
+
+# --- AI 이미지 분석 (JSON 강제 모드, 실패하면 마지막 원인을 담아 예외) ---
+IMAGE_TIMEOUT = 60
+ANALYZE_PROMPT = """
+    이 음식 사진들을 분석해서 [요리 이름], [필수 재료], [조리법]을 추출해.
+    절대 다른 설명이나 인사말은 하지 말고, 오직 아래 JSON 형식으로만 응답해.
+    {"name": "요리명", "ingredients": "재료1, 재료2", "steps": "조리법"}
+    """
+
+def analyze_recipe_images(client, cache, images, models=(GEMINI_MODEL,)):
+    # 같은 사진 묶음은 저장된 분석 결과를 그대로 돌려줍니다
+    cached = cache.get(image_set_key(models[0], images))
+    if cached is not None:
+        tracer.count("analysis_cache.hit")
+        return cached
+    tracer.count("analysis_cache.miss")
+
+    last_error = ""
+    for m in models:
+        try:
+            # AI가 무조건 JSON 형식으로만 대답하도록 강제
+            with tracer.span("gemini.analyze"):
+                text = client.submit(client.generate(m, [ANALYZE_PROMPT] + images, generation_config={"response_mime_type": "application/json"}, timeout=IMAGE_TIMEOUT)).result()
+            text = text.replace("```json", "").replace("```", "").strip()
+            try:
+                result = json.loads(text)
+            except json.JSONDecodeError:
+                # 혹시라도 파싱 에러가 나면 정규식으로 알맹이만 구출 시도
+                match = re.search(r'\{.*\}', text, re.DOTALL)
+                if match:
+                    result = json.loads(match.group(0))
+                else:
+                    raise ValueError(f"JSON 파싱 실패 (응답 일부): {text[:50]}...")
+            cache.put(image_set_key(m, images), result)
+            return result
+        except Exception as e:
+            last_error = str(e) or type(e).__name__
+    raise RuntimeError(last_error)
+
+# --- 추천 멘트 서비스 (캐시 조회 + 다음 추천 메뉴 멘트를 미리 생성) ---
+class BlurbService:
+    def __init__(self, cache, client, generate=generate_blurb):
+        self.cache = cache
+        self.client = client
+        self.generate = generate
+        self.lock = threading.RLock()
+        self.futures = {}
+
+    @staticmethod
+    def make_key(model_name, recipe_name, missing_items):
+        return json.dumps([model_name, recipe_name, sorted(missing_items)], ensure_ascii=False)
+
+    async def _fill(self, key, model_name, recipe_name, missing_items):
+        result = await self.generate(self.client, model_name, recipe_name, missing_items)
+        self.cache.put(key, result)
+        return result
+
+    def _forget(self, key, future):
+        with self.lock:
+            if self.futures.get(key) is future: del self.futures[key]
+
+    def _submit(self, key, model_name, recipe_name, missing_items):
+        # 호출 측 lock 안에서 불립니다
+        future = self.client.submit(self._fill(key, model_name, recipe_name, missing_items))
+        self.futures[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def request(self, model_name, recipe_name, missing_items):
+        # 캐시에 있으면 바로 끝난 Future, 미리 만들고 있던 중이면 그 Future를 그대로 돌려줍니다
+        key = self.make_key(model_name, recipe_name, missing_items)
+        cached = self.cache.get(key)
+        if cached is not None:
+            tracer.count("blurb_cache.hit")
+            future = Future()
+            future.set_result(cached)
+            return future
+        with self.lock:
+            future = self.futures.get(key)
+            tracer.count("blurb_cache.prefetched" if future else "blurb_cache.miss")
+            return future or self._submit(key, model_name, recipe_name, missing_items)
+
+    def prefetch(self, model_name, recipe_name, missing_items):
+        key = self.make_key(model_name, recipe_name, missing_items)
+        with self.lock:
+            if key in self.futures or self.cache.contains(key): return
+            tracer.count("blurb.prefetch")
+            self._submit(key, model_name, recipe_name, missing_items)
+
+# 멘트 서비스를 넘기지 않은 호출이 같이 쓰는 기본값 (클라이언트마다 이벤트 루프 스레드가 하나씩 생기므로 한 번만 만듭니다)
+_default_blurbs = None
+_default_blurbs_lock = threading.Lock()
+
+def default_blurb_service():
+    global _default_blurbs
+    with _default_blurbs_lock:
+        if _default_blurbs is None: _default_blurbs = BlurbService(JsonDiskCache(":memory:"), AsyncGeminiClient())
+        return _default_blurbs
+
+# --- AI 메뉴 추천 ---
+RECOMMEND_K = 3
+
+def fallback_recommendation(recipe, missing_text, cause):
+    tracer.count(f"blurb.fallback.{cause}")
+    return {
+        "name": recipe["요리명"],
+        "reason": "재료 조합상 현재 가장 해먹기 좋은 메뉴입니다! 😋",
+        "missing": missing_text,
+        "fallback": cause
+    }
+
+def get_ai_recommendations(api_key, pantry_list, recipe_list, excluded_list, recipe_index=None, score_cache=None, blurbs=None, k=1, on_result=None):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    pantry_set = normalize_pantry(pantry_list)
+    matcher = IngredientMatcher(pantry_set)
+    if recipe_index is None: recipe_index = RecipeIndex(recipe_list)
+    if blurbs is None: blurbs = default_blurb_service()
+
+    # 지금 보여줄 k개와, 다음 버튼에서 나올 k개까지 뽑습니다
+    with tracer.span("rank"):
+        if score_cache is not None: ranked = score_cache.top_k(k=2 * k, excluded=excluded_list)
+        else: ranked = recipe_index.top_k(pantry_set, k=2 * k, excluded=excluded_list)
+    if not ranked: return {"recommendations": []}
+
+    picks = [(recipe, missing_ingredients(recipe, matcher)) for recipe, _ in ranked[:k]]
+    # 같은 (이름, 빠진 재료)는 진행 중인 Future 하나를 나눠 쓰므로, Future마다 기다리는 자리를 모두 기억합니다
+    waiting = {}
+    for i, (recipe, missing) in enumerate(picks):
+        waiting.setdefault(blurbs.request(GEMINI_MODEL, recipe['요리명'], missing), []).append(i)
+    for next_recipe, _ in ranked[k:]:
+        blurbs.prefetch(GEMINI_MODEL, next_recipe['요리명'], missing_ingredients(next_recipe, matcher))
+
+    recs = [None] * len(picks)
+    def finish(i, rec):
+        recs[i] = rec
+        if on_result: on_result(i, rec)
+
+    with tracer.span("gemini.wait"):
+        try:
+            # 먼저 끝나는 순서대로 화면에 흘려보냅니다 (전체 대기 시간 ≈ 호출 한 번)
+            for future in as_completed(waiting, timeout=blurbs.client.timeout + 5):
+                for i in waiting[future]:
+                    recipe, missing = picks[i]
+                    try:
+                        rec = dict(future.result()["recommendations"][0])
+                        rec["name"], rec["missing"] = recipe["요리명"], format_missing(missing)
+                    except (asyncio.TimeoutError, FuturesTimeoutError):
+                        rec = fallback_recommendation(recipe, format_missing(missing), "timeout")
+                    except Exception:
+                        rec = fallback_recommendation(recipe, format_missing(missing), "error")
+                    finish(i, rec)
+        except FuturesTimeoutError:
+            pass
+    for i, (recipe, missing) in enumerate(picks):
+        if recs[i] is None: finish(i, fallback_recommendation(recipe, format_missing(missing), "timeout"))
+    return {"recommendations": recs}
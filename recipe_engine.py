@@ -0,0 +1,628 @@
+import re
+import bisect
+import heapq
+import threading
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+# ===============================
+# 🔥 재료 분류 및 텍스트 정리 도구
+# ===============================
+
+IGNORABLE_INGREDIENTS = {
+    "대파", "쪽파", "파", "양파", "마늘", "다진마늘",
+    "청양고추", "고추", "당근", "홍고추",
+    "고춧가루", "후추", "참깨", "깨",
+    "간장", "진간장", "국간장", "고추장", "된장", "쌈장",
+    "설탕", "올리고당", "물엿", "맛술", "미림",
+    "참기름", "들기름", "식용유", "소금", "물", "육수", "치킨스톡", "굴소스"
+}
+
+PORK_EQUIVALENTS = {"목살", "삼겹살", "앞다리살", "뒷다리살", "대패삼겹살", "돼지고기", "다짐육"}
+
+# 정규식은 매번 새로 파싱하지 않도록 미리 컴파일해 둡니다
+PAREN_RE = re.compile(r'\(.*?\)')
+QUANTITY_RE = re.compile(r'\d+(?:g|kg|ml|L|l|개|스푼|큰술|작은술|컵|마리|모|봉|인분|t|T)?')
+FRACTION_RE = re.compile(r'\d+/\d+(?:스푼|컵|큰술)?')
+KOREAN_AMOUNT_RE = re.compile(r'(?:한|두|세|네|반)\s*(?:바퀴|줌|꼬집|스푼|큰술|컵)')
+SYMBOL_RE = re.compile(r'[^\w\s]')
+
+def clean_ingredient_text(text):
+    text = str(text)
+    text = PAREN_RE.sub('', text)
+    text = QUANTITY_RE.sub('', text)
+    text = FRACTION_RE.sub('', text)
+    text = KOREAN_AMOUNT_RE.sub('', text)
+    text = SYMBOL_RE.sub('', text)
+    return text.strip()
+
+def normalize_pantry(pantry_list):
+    pantry = set(pantry_list)
+    if any(meat in pantry for meat in PORK_EQUIVALENTS):
+        pantry.add("돼지고기")
+    return pantry
+
+def check_is_present(recipe_ing, pantry_set):
+    cleaned_ing = clean_ingredient_text(recipe_ing)
+    for ignore in IGNORABLE_INGREDIENTS:
+        if ignore in cleaned_ing: return True
+    if any(pork in cleaned_ing for pork in PORK_EQUIVALENTS):
+        if "돼지고기" in pantry_set: return True
+    for p_item in pantry_set:
+        if p_item in cleaned_ing: return True
+    return False
+
+# --- 아호-코라식 자동기 (여러 단어를 한 번의 스캔으로 찾기) ---
+class AhoCorasick:
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [False]
+        self.has_empty = False
+        for pattern in patterns:
+            if not pattern:
+                self.has_empty = True
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(False)
+                node = nxt
+            self.output[node] = True
+
+        # BFS로 실패 링크를 연결하고, 실패 경로에 있는 출력도 물려받습니다
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] or self.output[self.fail[nxt]]
+                queue.append(nxt)
+
+    def contains_any(self, text):
+        if self.has_empty: return True
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]: return True
+        return False
+
+# --- 재료 매칭기 (냉장고 하나당 한 번만 만들어서 재사용) ---
+class IngredientMatcher:
+    def __init__(self, pantry_set):
+        # check_is_present의 세 단계(무시 재료 / 돼지고기 대체 / 냉장고 재료)를 하나의 패턴 집합으로 합칩니다
+        patterns = set(IGNORABLE_INGREDIENTS) | set(pantry_set)
+        if "돼지고기" in pantry_set:
+            patterns |= PORK_EQUIVALENTS
+        self.pantry_set = frozenset(pantry_set)
+        self.automaton = AhoCorasick(patterns)
+        self._cache = {}
+        self._token_cache = {}
+
+    def is_present(self, recipe_ing):
+        hit = self._cache.get(recipe_ing)
+        if hit is None:
+            hit = self.automaton.contains_any(clean_ingredient_text(recipe_ing))
+            self._cache[recipe_ing] = hit
+        return hit
+
+    def contains(self, token):
+        # 이미 정리된 재료 토큰용 (정규식 정리를 건너뜁니다)
+        hit = self._token_cache.get(token)
+        if hit is None:
+            hit = self.automaton.contains_any(token)
+            self._token_cache[token] = hit
+        return hit
+
+# 매칭기를 넘기지 않은 호출은 같은 냉장고끼리 하나를 나눠 씁니다 (레시피마다 자동기를 새로 만들지 않음)
+@lru_cache(maxsize=64)
+def shared_matcher(pantry):
+    return IngredientMatcher(pantry)
+
+# --- 쓰기 시점 전처리 (정리된 재료 토큰 + 번호 매긴 조리법을 원문 체크섬과 함께 저장) ---
+# 시트에서 원문을 직접 고치면 체크섬이 안 맞으므로 그 행만 다시 계산합니다
+PARSED_COLUMNS = ["재료토큰", "조리순서"]
+TOKEN_SEP = "|"  # SYMBOL_RE가 기호를 모두 지우므로 토큰 안에는 나올 수 없습니다
+
+def _stamp(raw):
+    return f"{zlib.crc32(str(raw).encode()):08x}:"
+
+def _unstamp(raw, stored):
+    if not isinstance(stored, str): return None
+    prefix = _stamp(raw)
+    return stored[len(prefix):] if stored.startswith(prefix) else None
+
+def parse_ingredients(text):
+    return [clean_ingredient_text(x.strip()) for x in str(text).split(",")]
+
+def parsed_columns(recipe):
+    # 저장된 값이 원문과 맞으면 그대로 쓰고, 아니면 새로 계산합니다
+    tokens = recipe.get("재료토큰")
+    if _unstamp(recipe["필수재료"], tokens) is None:
+        tokens = _stamp(recipe["필수재료"]) + TOKEN_SEP.join(parse_ingredients(recipe["필수재료"]))
+    steps = recipe.get("조리순서")
+    if _unstamp(recipe["조리법"], steps) is None:
+        steps = _stamp(recipe["조리법"]) + format_steps(recipe["조리법"])
+    return {"재료토큰": tokens, "조리순서": steps}
+
+def recipe_tokens(recipe):
+    stored = recipe.get("재료토큰")
+    return _tokens(str(recipe["필수재료"]), stored if isinstance(stored, str) else None)
+
+# 같은 원문은 한 번만 정리합니다 (재료토큰이 없는 시트/CSV/배치 입력도 두 번째 호출부터는 정규식을 건너뜀)
+TOKEN_CACHE_SIZE = 1 << 17
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _tokens(raw, stored):
+    tokens = _unstamp(raw, stored)
+    return tuple(parse_ingredients(raw) if tokens is None else tokens.split(TOKEN_SEP))
+
+def recipe_steps(recipe):
+    stored = _unstamp(recipe["조리법"], recipe.get("조리순서"))
+    return format_steps(recipe["조리법"]) if stored is None else stored
+
+def score_recipe(pantry_set, recipe_row, matcher=None):
+    if matcher is None: matcher = shared_matcher(frozenset(pantry_set))
+    match_count = sum(1 for token in recipe_tokens(recipe_row) if matcher.contains(token))
+    return match_count
+
+# 부분 문자열 매칭용: 글자 → 그 글자를 포함한 재료 토큰
+def char_postings(tokens):
+    postings = {}
+    for token in tokens:
+        for ch in set(token):
+            postings.setdefault(ch, set()).add(token)
+    return postings
+
+def tokens_containing(char_postings, tokens, pattern):
+    if not pattern: return list(tokens)
+    buckets = [char_postings.get(ch) for ch in set(pattern)]
+    if not all(buckets): return []
+    return [t for t in min(buckets, key=len) if pattern in t]
+
+# --- 재료 → 레시피 역색인 (냉장고 재료로 닿는 레시피만 채점) ---
+class RecipeIndex:
+    def __init__(self, recipe_list):
+        self.recipes = list(recipe_list)
+        self.names = [r["요리명"] for r in self.recipes]
+        ignorable = AhoCorasick(IGNORABLE_INGREDIENTS)
+        # 무시 재료(양념 등)는 냉장고와 상관없이 항상 '있음'이라 미리 점수에 넣어 둡니다
+        self.base_scores = [0] * len(self.recipes)
+        self.postings = {}
+        for idx, r in enumerate(self.recipes):
+            for cleaned in recipe_tokens(r):
+                if ignorable.contains_any(cleaned):
+                    self.base_scores[idx] += 1
+                else:
+                    counts = self.postings.setdefault(cleaned, {})
+                    counts[idx] = counts.get(idx, 0) + 1
+        self.char_postings = char_postings(self.postings)
+        self.base_order = sorted(range(len(self.recipes)), key=lambda i: -self.base_scores[i])
+        self._similarity = None
+
+    def similarity(self):
+        # 비슷한 레시피 색인은 처음 찾을 때 한 번 만들어 같은 버전의 색인끼리 나눠 씁니다
+        if self._similarity is None: self._similarity = SimilarityIndex(self)
+        return self._similarity
+
+    def tokens_containing(self, pattern):
+        return tokens_containing(self.char_postings, self.postings, pattern)
+
+    def score_reachable(self, pantry_set):
+        patterns = set(pantry_set)
+        if "돼지고기" in pantry_set: patterns |= PORK_EQUIVALENTS
+        matched = set()
+        for p in patterns:
+            matched.update(self.tokens_containing(p))
+        scores = {}
+        for token in matched:
+            for idx, count in self.postings[token].items():
+                scores[idx] = scores.get(idx, self.base_scores[idx]) + count
+        return scores
+
+    def top_k(self, pantry_set, k=1, excluded=()):
+        excluded = set(excluded)
+        scores = self.score_reachable(pantry_set)
+        candidates = [(-score, idx) for idx, score in scores.items() if self.names[idx] not in excluded]
+        # 닿지 않은 레시피는 기본 점수 순서대로 앞에서 k개만 후보로 둡니다
+        rest = 0
+        for idx in self.base_order:
+            if rest >= k: break
+            if idx in scores or self.names[idx] in excluded: continue
+            candidates.append((-self.base_scores[idx], idx))
+            rest += 1
+        return [(self.recipes[idx], -neg) for neg, idx in heapq.nsmallest(k, candidates)]
+
+# --- 냉장고 변경 시 점수 증분 갱신 (바뀐 재료가 닿는 레시피만 다시 계산) ---
+class PantryScoreCache:
+    def __init__(self, recipe_index, pantry_list):
+        self.index = recipe_index
+        self.items = Counter(pantry_list)
+        self.scores = list(recipe_index.base_scores)
+        self.token_hits = {}
+        for pattern in self._patterns():
+            self._apply(pattern, 1, set())
+        self._rebuild_heap()
+
+    def _patterns(self):
+        # normalize_pantry + 돼지고기 대체 규칙을 펼친 '매칭 패턴' 집합
+        patterns = {item for item, n in self.items.items() if n > 0}
+        if patterns & PORK_EQUIVALENTS: patterns |= PORK_EQUIVALENTS
+        return patterns
+
+    def _rebuild_heap(self):
+        self.heap = [(-score, idx) for idx, score in enumerate(self.scores)]
+        heapq.heapify(self.heap)
+
+    def _apply(self, pattern, sign, touched):
+        for token in self.index.tokens_containing(pattern):
+            before = self.token_hits.get(token, 0)
+            after = before + sign
+            if after: self.token_hits[token] = after
+            else: self.token_hits.pop(token, None)
+            if (before == 0) != (after == 0):
+                for idx, count in self.index.postings[token].items():
+                    self.scores[idx] += sign * count
+                    touched.add(idx)
+
+    def _update(self, item, delta):
+        before = self._patterns()
+        self.items[item] += delta
+        if self.items[item] <= 0: del self.items[item]
+        after = self._patterns()
+        touched = set()
+        for pattern in after - before: self._apply(pattern, 1, touched)
+        for pattern in before - after: self._apply(pattern, -1, touched)
+        # 순위 힙에는 새 점수를 넣기만 하고, 옛 항목은 top_k에서 걸러냅니다
+        for idx in touched:
+            heapq.heappush(self.heap, (-self.scores[idx], idx))
+        if len(self.heap) > 2 * len(self.scores) + 64: self._rebuild_heap()
+
+    def add(self, item):
+        self._update(item, 1)
+
+    def remove(self, item):
+        if self.items.get(item): self._update(item, -1)
+
+    def top_k(self, k=1, excluded=()):
+        excluded = set(excluded)
+        kept, seen, ranked = [], set(), []
+        while self.heap and len(ranked) < k:
+            neg, idx = heapq.heappop(self.heap)
+            if -neg != self.scores[idx] or idx in seen: continue
+            seen.add(idx)
+            kept.append((neg, idx))
+            if self.index.names[idx] not in excluded:
+                ranked.append((self.index.recipes[idx], -neg))
+        for entry in kept:
+            heapq.heappush(self.heap, entry)
+        return ranked
+
+def _column_positions(indptr, token_ids):
+    # CSC 배열에서 여러 재료 열의 구간을 이어 붙인 위치 배열과, 재료마다 몇 칸씩인지
+    starts, ends = indptr[token_ids], indptr[token_ids + 1]
+    sizes = ends - starts
+    return _runs(starts, sizes), sizes
+
+def _distinct(values):
+    import numpy as np
+    # 작은 정수 배열의 중복 제거 (np.unique보다 정렬 한 번이 빠릅니다)
+    values = np.sort(values)
+    return values[np.concatenate([[True], values[1:] != values[:-1]])] if len(values) else values
+
+def _runs(starts, sizes):
+    import numpy as np
+    # starts[i]부터 sizes[i]칸씩 이어 붙인 위치 배열
+    return np.repeat(starts - np.concatenate([[0], np.cumsum(sizes)[:-1]]), sizes) + np.arange(sizes.sum())
+
+# --- 벡터화 채점기 (재료 × 레시피 희소행렬, 여러 냉장고를 한 번에 채점) ---
+# numpy는 행렬을 실제로 만들 때만 불러옵니다 (화면/엔진 import 시간을 가볍게 유지)
+class RecipeMatrix:
+    BATCH = 64
+
+    def __init__(self, recipe_index):
+        import numpy as np
+        self.index = recipe_index
+        self.vocab = list(recipe_index.postings)
+        self.token_ids = {t: i for i, t in enumerate(self.vocab)}
+        # CSC 형태: 재료(열)마다 그 재료를 쓰는 레시피 번호와 개수를 이어 붙여 둡니다
+        lengths = [len(recipe_index.postings[t]) for t in self.vocab]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        self.rows = np.fromiter((i for t in self.vocab for i in recipe_index.postings[t]), dtype=np.int64, count=int(self.indptr[-1]))
+        self.data = np.fromiter((c for t in self.vocab for c in recipe_index.postings[t].values()), dtype=np.float64, count=int(self.indptr[-1]))
+        self.base = np.asarray(recipe_index.base_scores, dtype=np.float64)
+        self.names = np.asarray(recipe_index.names, dtype=object)
+
+    def pantry_tokens(self, pantry_set):
+        import numpy as np
+        patterns = set(pantry_set)
+        if "돼지고기" in pantry_set: patterns |= PORK_EQUIVALENTS
+        hits = set()
+        for p in patterns:
+            hits.update(self.token_ids[t] for t in self.index.tokens_containing(p))
+        return np.fromiter(hits, dtype=np.int64, count=len(hits))
+
+    def pantry_vector(self, pantry_set):
+        import numpy as np
+        vec = np.zeros(len(self.vocab), dtype=np.float64)
+        vec[self.pantry_tokens(pantry_set)] = 1
+        return vec
+
+    def _gather(self, token_ids):
+        pos, _ = _column_positions(self.indptr, token_ids)
+        return self.rows[pos], self.data[pos]
+
+    def score(self, pantry_set):
+        import numpy as np
+        rows, data = self._gather(self.pantry_tokens(pantry_set))
+        return self.base + np.bincount(rows, weights=data, minlength=len(self.base))
+
+    def score_many(self, pantry_sets):
+        import numpy as np
+        # 결과는 (레시피 수, 냉장고 수) 행렬. 내부적으로는 냉장고별로 연속된 메모리에 채웁니다
+        n = len(self.base)
+        out = np.empty((len(pantry_sets), n), dtype=np.float64)
+        for start in range(0, len(pantry_sets), self.BATCH):
+            chunk = pantry_sets[start:start + self.BATCH]
+            rows, data = [], []
+            for j, pantry_set in enumerate(chunk):
+                r, d = self._gather(self.pantry_tokens(pantry_set))
+                rows.append(r + j * n); data.append(d)
+            flat = np.bincount(np.concatenate(rows), weights=np.concatenate(data), minlength=n * len(chunk))
+            out[start:start + len(chunk)] = flat.reshape(len(chunk), n) + self.base
+        return out.T
+
+    def top_k_many(self, pantry_sets, k=1, excluded=()):
+        import numpy as np
+        scores = self.score_many(list(pantry_sets))
+        if excluded:
+            scores[np.isin(self.names, list(excluded))] = -np.inf
+        results = []
+        for col in np.ascontiguousarray(scores.T):
+            if len(col) > k:
+                kth = np.partition(col, len(col) - k)[len(col) - k]
+                valid = np.flatnonzero(col >= kth)
+            else:
+                valid = np.arange(len(col))
+            valid = valid[col[valid] > -np.inf]
+            # 점수 내림차순, 동점이면 원래 순서대로
+            best = valid[np.lexsort((valid, -col[valid]))][:k]
+            results.append([(self.index.recipes[i], int(col[i])) for i in best])
+        return results
+
+# --- 비슷한 레시피 색인 (재료 TF-IDF 벡터의 코사인 유사도, 겹치는 재료가 있는 레시피만 계산) ---
+DUPLICATE_SIMILARITY = 0.8  # 이 이상이면 이름만 바꾼 같은 레시피로 봅니다
+SIMILAR_GATHER = 16384      # 한 번 찾을 때 읽는 역색인 칸 수 상한 (드문 재료부터 읽고, 넘치는 흔한 재료는 후보 찾기에서 뺍니다)
+SIMILAR_RESCORE = 128       # 읽은 칸으로 매긴 부분 점수 상위 후보만 전체 벡터로 다시 계산합니다
+MINHASH_BANDS, MINHASH_ROWS = 20, 4  # 중복 후보 찾기용 MinHash LSH (밴드 하나 = 해시 4개를 묶은 버킷)
+MINHASH_PRIME = 4294967311  # 2^32보다 큰 소수 (a*x+b가 uint64를 넘지 않게 a < 2^31)
+
+class SimilarityIndex:
+    def __init__(self, recipe_index):
+        import numpy as np
+        self.index = recipe_index
+        n = len(recipe_index.recipes)
+        # 양념까지 모든 재료 토큰을 넣고, 흔한 재료는 idf로 가볍게 만듭니다 (이름만 바꾼 복사본은 양념까지 같음)
+        postings = {}
+        for idx, r in enumerate(recipe_index.recipes):
+            for token in recipe_tokens(r):
+                if token:
+                    counts = postings.setdefault(token, {})
+                    counts[idx] = counts.get(idx, 0) + 1
+        self.token_ids = {t: i for i, t in enumerate(postings)}
+        self.char_postings = char_postings(postings)
+        sizes = np.fromiter((len(p) for p in postings.values()), dtype=np.int64, count=len(postings))
+        self.indptr = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        rows = np.fromiter((i for p in postings.values() for i in p), dtype=np.int64, count=int(self.indptr[-1]))
+        tf = np.fromiter((c for p in postings.values() for c in p.values()), dtype=np.float64, count=int(self.indptr[-1]))
+        # smooth idf (처음 보는 재료는 df=0)
+        self.idf = np.log((1 + n) / (1 + sizes)) + 1
+        self.unseen_idf = float(np.log(1 + n) + 1)
+        weights = tf * np.repeat(self.idf, sizes)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        weights /= norms[rows]
+        cols = np.repeat(np.arange(len(sizes)), sizes)
+        # 재료 열 안은 가중치 큰 순으로 둡니다 (상한에 걸리면 그 재료 비중이 큰 레시피부터 읽음)
+        order = np.lexsort((rows, -weights, cols))
+        self.rows, self.weights = rows[order], weights[order]
+        # 후보를 다시 계산할 때 쓰는 레시피 → 재료 방향(CSR) 사본
+        order = np.lexsort((cols, rows))
+        self.doc_tokens, self.doc_weights = cols[order], weights[order]
+        self.doc_indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64)
+        self.by_name = {}
+        for idx, name in enumerate(recipe_index.names): self.by_name.setdefault(name, []).append(idx)
+        self._build_minhash(list(postings))
+
+    def _build_minhash(self, tokens):
+        import numpy as np
+        rng = np.random.default_rng(0)
+        self.hash_a = rng.integers(1, 1 << 31, (MINHASH_BANDS * MINHASH_ROWS, 1), dtype=np.uint64)
+        self.hash_b = rng.integers(0, 1 << 31, (MINHASH_BANDS * MINHASH_ROWS, 1), dtype=np.uint64)
+        token_hashes = self._hashes(tokens)
+        docs = np.flatnonzero(np.diff(self.doc_indptr))  # 재료가 하나도 없는 레시피는 버킷에 넣지 않습니다
+        signatures = np.empty((len(token_hashes), len(docs)), dtype=np.uint64)
+        for f, h in enumerate(token_hashes):
+            if len(docs): signatures[f] = np.minimum.reduceat(h[self.doc_tokens], self.doc_indptr[docs])
+        keys = self._band_keys(signatures).ravel()
+        order = np.argsort(keys, kind="stable")
+        self.bucket_keys, self.bucket_rows = keys[order], np.tile(docs, MINHASH_BANDS)[order]
+
+    def _hashes(self, tokens):
+        import numpy as np
+        x = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+        return (self.hash_a * x + self.hash_b) % np.uint64(MINHASH_PRIME)
+
+    def _band_keys(self, signatures):
+        import numpy as np
+        # 밴드마다 해시 ROWS개를 하나의 키로 묶고, 밴드 번호도 섞어 밴드끼리 섞이지 않게 합니다 (uint64 넘침은 그대로 둠)
+        bands = signatures.reshape(MINHASH_BANDS, MINHASH_ROWS, -1)
+        keys = np.arange(MINHASH_BANDS, dtype=np.uint64)[:, None] * np.uint64(0x9E3779B97F4A7C15)
+        for r in range(MINHASH_ROWS): keys = keys * np.uint64(1000003) + bands[:, r]
+        return keys
+
+    def _vector(self, counts):
+        import numpy as np
+        ids = np.fromiter((self.token_ids.get(t, -1) for t in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        weights *= np.where(ids >= 0, self.idf[np.maximum(ids, 0)] if len(self.idf) else 0, self.unseen_idf)
+        norm = np.sqrt((weights * weights).sum())
+        known = ids >= 0
+        return ids[known], (weights[known] / norm if norm else weights[known])
+
+    def recipe_vector(self, recipe):
+        return self._vector(Counter(t for t in recipe_tokens(recipe) if t))
+
+    def pantry_vector(self, pantry_set):
+        import numpy as np
+        # 냉장고 재료는 레시피 재료 토큰에 부분 문자열로 들어 있으면 같은 재료로 봅니다 (돼지고기 대체 포함)
+        patterns = set(pantry_set)
+        if "돼지고기" in pantry_set: patterns |= PORK_EQUIVALENTS
+        hits = {self.token_ids[t] for p in patterns for t in tokens_containing(self.char_postings, self.token_ids, p)}
+        ids = np.fromiter(hits, dtype=np.int64, count=len(hits))
+        weights = self.idf[ids]
+        norm = np.sqrt((weights * weights).sum())
+        return ids, (weights / norm if norm else weights)
+
+    def rescore(self, candidates, ids, weights):
+        import numpy as np
+        # 후보 레시피들과의 정확한 코사인 유사도
+        query = np.zeros(len(self.idf)); query[ids] = weights
+        pos, sizes = _column_positions(self.doc_indptr, candidates)
+        owner = np.repeat(np.arange(len(candidates)), sizes)
+        return np.bincount(owner, weights=self.doc_weights[pos] * query[self.doc_tokens[pos]], minlength=len(candidates))
+
+    def _search(self, ids, weights, k, excluded=()):
+        import numpy as np
+        starts = self.indptr[ids]
+        sizes = self.indptr[ids + 1] - starts
+        # 드문 재료부터 역색인을 읽다가 SIMILAR_GATHER를 넘기는 흔한 재료는 앞부분(비중 큰 레시피)만 읽습니다
+        # 덜 읽은 재료도 마지막에 후보를 다시 계산할 때는 빠짐없이 들어갑니다
+        order = np.argsort(sizes, kind="stable")
+        room = np.maximum(SIMILAR_GATHER - (np.cumsum(sizes[order]) - sizes[order]), 0)
+        take = np.empty_like(sizes)
+        take[order] = np.minimum(sizes[order], room)
+        pos = _runs(starts, take)
+        rows = self.rows[pos]
+        partial = np.bincount(rows, weights=self.weights[pos] * np.repeat(weights, take), minlength=len(self.index.recipes))
+        for name in excluded:
+            partial[self.by_name.get(name, [])] = 0
+        # 한 레시피는 재료 수만큼 여러 칸에 나오므로 그만큼 넉넉히 골라 중복을 없앤 뒤 상위 후보만 남깁니다
+        limit = SIMILAR_RESCORE * max(len(ids), 1)
+        if len(rows) > limit: rows = rows[np.argpartition(-partial[rows], limit - 1)[:limit]]
+        candidates = _distinct(rows[partial[rows] > 0])
+        if len(candidates) > SIMILAR_RESCORE:
+            candidates = candidates[np.argpartition(-partial[candidates], SIMILAR_RESCORE - 1)[:SIMILAR_RESCORE]]
+        return self._top(candidates, self.rescore(candidates, ids, weights), k)
+
+    def _top(self, candidates, sims, k, threshold=0.0):
+        import numpy as np
+        keep = sims > threshold
+        candidates, sims = candidates[keep], sims[keep]
+        if len(candidates) > k:
+            best = np.argpartition(-sims, k - 1)[:k]
+            candidates, sims = candidates[best], sims[best]
+        # 유사도 내림차순, 동점이면 원래 순서대로
+        order = np.lexsort((candidates, -sims))
+        return [(self.index.recipes[c], float(s)) for c, s in zip(candidates[order], sims[order])]
+
+    def similar_recipes(self, recipe, k=3, excluded=()):
+        return self._search(*self.recipe_vector(recipe), k, set(excluded) | {recipe.get("요리명")})
+
+    def similar_to_pantry(self, pantry_set, k=3, excluded=()):
+        return self._search(*self.pantry_vector(pantry_set), k, excluded)
+
+    def near_duplicates(self, recipe, threshold=DUPLICATE_SIMILARITY, skip=()):
+        import numpy as np
+        # 재료 집합의 MinHash 밴드가 하나라도 같은 레시피만 후보로 보고 정확한 유사도로 거릅니다
+        # 재료가 같은 복사본은 서명이 같아 반드시 걸리고, 경계(0.8) 근처는 드물게 놓칠 수 있습니다
+        counts = Counter(t for t in recipe_tokens(recipe) if t)
+        if not counts: return []
+        keys = self._band_keys(self._hashes(list(counts)).min(axis=1, keepdims=True)).ravel()
+        lo = np.searchsorted(self.bucket_keys, keys, "left")
+        hi = np.searchsorted(self.bucket_keys, keys, "right")
+        candidates = _distinct(self.bucket_rows[_runs(lo, hi - lo)])
+        # skip: 비교에서 뺄 레시피 번호 (고치는 중인 자기 자신, 지워질 행 등)
+        if skip: candidates = candidates[~np.isin(candidates, list(skip))]
+        return self._top(candidates, self.rescore(candidates, *self._vector(counts)), len(candidates), threshold=threshold - 1e-9)
+
+# --- 유통기한 색인 (남은 일수로 정렬해 두고 '지남' / 'N일 이내'를 이분 탐색으로) ---
+class ExpiryIndex:
+    def __init__(self, keys, days_left):
+        # 날짜가 없는 재료(소스/조미료, NaN/None)는 색인에 넣지 않습니다
+        pairs = sorted(((int(d), i, k) for i, (k, d) in enumerate(zip(keys, days_left)) if d is not None and d == d))
+        self.days = [d for d, _, _ in pairs]
+        self.keys = [k for _, _, k in pairs]
+
+    def expired(self):
+        return self.keys[:bisect.bisect_left(self.days, 0)]
+
+    def expiring_within(self, n):
+        # 오늘(0일)부터 n일 남은 것까지, 급한 순서대로
+        return self.keys[bisect.bisect_left(self.days, 0):bisect.bisect_right(self.days, n)]
+
+# --- 세션 공용 레시피 색인 (새 버전은 따로 다 만든 다음 참조만 바꿔 끼우는 copy-on-write) ---
+class SharedRecipeIndex:
+    def __init__(self):
+        self.lock = threading.Lock()  # 새 버전을 만드는 쪽끼리만 직렬화
+        self.current = (None, None)   # (원본 버전 키, 만들어진 값) — 튜플 하나라 통째로 바뀝니다
+        self.builds = 0
+
+    def get(self, source_key, build):
+        # source_key는 원본의 현재 버전 키를 돌려주는 함수입니다. 지금 버전을 먼저 잡아 둔 다음에 불러야
+        # 그 사이 다른 세션이 올린 버전보다 오래된 키로 다시 만드는 일이 없습니다
+        seen = self.current
+        key = source_key()
+        # 버전이 같으면 잠금 없이 바로 돌려줍니다. 만들어진 값은 읽기 전용으로만 써야 합니다
+        if seen[0] == key: return seen[1]
+        # 다른 세션이 새 버전을 만드는 중이면 기다리지 않고 지금 버전을 그대로 씁니다 (처음 한 번만 대기)
+        if not self.lock.acquire(blocking=seen[1] is None): return seen[1]
+        try:
+            return self._publish(seen, key, build)
+        finally:
+            self.lock.release()
+
+    def refresh(self, source_key, build):
+        # 방금 쓴 쪽은 자기 변경이 반영된 버전을 바로 봐야 하므로 기다려서라도 새로 만듭니다
+        with self.lock:
+            return self._publish(self.current, source_key(), build)
+
+    def _publish(self, seen, key, build):
+        current = self.current
+        # 기다리는 사이 다른 세션이 새 버전을 올렸으면 그걸 씁니다 (우리가 본 것보다 새것)
+        if current is not seen or current[0] == key: return current[1]
+        value = build()
+        self.builds += 1
+        self.current = (key, value)
+        return value
+
+def format_steps(text):
+    text = str(text).strip()
+    text = re.sub(r'(\d+[\.\)])', r'\n\1', text)
+    if not re.search(r'\d+[\.\)]', text):
+        steps = text.split('.')
+        formatted = []
+        idx = 1
+        for step in steps:
+            if step.strip():
+                formatted.append(f"{idx}. {step.strip()}.")
+                idx += 1
+        return "\n".join(formatted)
+    return text
+
+def missing_ingredients(recipe, matcher):
+    raw_ingredients = [x.strip() for x in str(recipe['필수재료']).split(",")]
+    return [raw_ing for raw_ing, token in zip(raw_ingredients, recipe_tokens(recipe)) if not matcher.contains(token)]
+
+def format_missing(missing_items):
+    return ", ".join(missing_items) if missing_items else "없음 (완벽해요!)"
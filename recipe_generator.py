@@ -1,510 +1,578 @@
-import streamlit as st
-import pandas as pd
-from datetime import date, timedelta
-import random
-import os
-import re
-import google.generativeai as genai
-import json
-from PIL import Image
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import time
-
-# ===============================
-# 🔥 재료 분류 및 텍스트 정리 도구
-# ===============================
-
-IGNORABLE_INGREDIENTS = {
-    "대파", "쪽파", "파", "양파", "마늘", "다진마늘",
-    "청양고추", "고추", "당근", "홍고추",
-    "고춧가루", "후추", "참깨", "깨",
-    "간장", "진간장", "국간장", "고추장", "된장", "쌈장",
-    "설탕", "올리고당", "물엿", "맛술", "미림",
-    "참기름", "들기름", "식용유", "소금", "물", "육수", "치킨스톡", "굴소스"
-}
-
-PORK_EQUIVALENTS = {"목살", "삼겹살", "앞다리살", "뒷다리살", "대패삼겹살", "돼지고기", "다짐육"}
-
-def clean_ingredient_text(text):
-    text = str(text)
-    text = re.sub(r'\(.*?\)', '', text)
-    text = re.sub(r'\d+(?:g|kg|ml|L|l|개|스푼|큰술|작은술|컵|마리|모|봉|인분|t|T)?', '', text)
-    text = re.sub(r'\d+/\d+(?:스푼|컵|큰술)?', '', text) 
-    text = re.sub(r'(?:한|두|세|네|반)\s*(?:바퀴|줌|꼬집|스푼|큰술|컵)', '', text) 
-    text = re.sub(r'[^\w\s]', '', text) 
-    return text.strip()
-
-def normalize_pantry(pantry_list):
-    pantry = set(pantry_list)
-    if any(meat in pantry for meat in PORK_EQUIVALENTS):
-        pantry.add("돼지고기")
-    return pantry
-
-def check_is_present(recipe_ing, pantry_set):
-    cleaned_ing = clean_ingredient_text(recipe_ing)
-    for ignore in IGNORABLE_INGREDIENTS:
-        if ignore in cleaned_ing: return True
-    if any(pork in cleaned_ing for pork in PORK_EQUIVALENTS):
-        if "돼지고기" in pantry_set: return True
-    for p_item in pantry_set:
-        if p_item in cleaned_ing: return True
-    return False
-
-def score_recipe(pantry_set, recipe_row):
-    ingredients = [x.strip() for x in str(recipe_row["필수재료"]).split(",")]
-    match_count = sum(1 for ing in ingredients if check_is_present(ing, pantry_set))
-    return match_count
-
-def format_steps(text):
-    text = str(text).strip()
-    text = re.sub(r'(\d+[\.\)])', r'\n\1', text)
-    if not re.search(r'\d+[\.\)]', text):
-        steps = text.split('.')
-        formatted = []
-        idx = 1
-        for step in steps:
-            if step.strip():
-                formatted.append(f"{idx}. {step.strip()}.")
-                idx += 1
-        return "\n".join(formatted)
-    return text
-
-# --- 구글 시트 설정 ---
-SHEET_NAME = "cooking_db"
-PANTRY_TAB = "pantry"
-RECIPE_TAB = "recipes"
-
-# --- [스타일] ---
-def apply_cute_style():
-    st.markdown("""
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Gowun+Dodum&display=swap');
-        .stApp { background-color: #FFF9C4 !important; }
-        h1, h2, h3, p, label, div[data-testid="stMarkdownContainer"], div[data-baseweb="select"], li {
-            font-family: 'Gowun Dodum', sans-serif !important;
-            color: #5D4037 !important;
-        }
-        .main-title {
-            font-weight: bold; color: #5D4037; margin-bottom: 20px;
-            font-family: 'Gowun Dodum', sans-serif !important; word-break: keep-all;
-        }
-        @media (min-width: 601px) { .main-title { font-size: 3rem; } }
-        @media (max-width: 600px) { .main-title { font-size: 1.8rem; } h2 { font-size: 1.5rem !important; } }
-        div.stButton > button {
-            border-radius: 20px !important; background: linear-gradient(to bottom right, #FFAB91, #FFCCBC) !important;
-            color: white !important; border: none !important; box-shadow: 2px 2px 5px rgba(0,0,0,0.1) !important;
-            font-family: 'Gowun Dodum', sans-serif !important; font-size: 1.1rem !important; font-weight: bold !important;
-            padding-top: 10px !important; padding-bottom: 10px !important; transition: all 0.2s ease-in-out !important;
-        }
-        div.stButton > button:hover { transform: scale(1.02) !important; background: linear-gradient(to bottom right, #FF8A65, #FFAB91) !important; color: white !important; }
-        div[data-baseweb="input"] > div, div[data-baseweb="textarea"] > div {
-            border-radius: 15px !important; border: 2px solid #FFE082 !important; background-color: #FFFDE7 !important;
-        }
-        section[data-testid="stSidebar"] { background-color: #FFF59D !important; }
-        div[data-testid="stVerticalBlockBorderWrapper"] {
-            border-radius: 15px !important; border: 2px solid #AED581 !important; background-color: #F1F8E9 !important; padding: 15px !important;
-        }
-        div[data-baseweb="radio"] label, div[data-baseweb="checkbox"] label { font-family: 'Gowun Dodum', sans-serif !important; }
-        /* 탭 스타일링 */
-        button[data-baseweb="tab"] { font-family: 'Gowun Dodum', sans-serif !important; font-size: 1.1rem !important; }
-        </style>
-    """, unsafe_allow_html=True)
-
-# --- 구글 시트 연결 ---
-def get_gsheet_client():
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds_dict = dict(st.secrets["gcp_service_account"])
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(creds)
-    return client
-
-# --- 데이터 로드 (보관장소 컬럼 추가) ---
-@st.cache_data(ttl=10)
-def load_data(tab_name, columns):
-    try:
-        client = get_gsheet_client()
-        sheet = client.open(SHEET_NAME).worksheet(tab_name)
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
-        if df.empty: return pd.DataFrame(columns=columns)
-        for col in columns:
-            if col not in df.columns: df[col] = ""
-        return df[columns]
-    except Exception as e:
-        return pd.DataFrame(columns=columns)
-
-# --- 데이터 저장 ---
-def save_data_overwrite(df, tab_name):
-    try:
-        client = get_gsheet_client()
-        sheet = client.open(SHEET_NAME).worksheet(tab_name)
-        df_save = df.copy().fillna("")
-        if '유통기한' in df_save.columns:
-            df_save['유통기한'] = df_save['유통기한'].apply(lambda x: "" if pd.isna(x) or str(x) == "NaT" else str(x))
-        sheet.clear() 
-        sheet.update([df_save.columns.values.tolist()] + df_save.values.tolist())
-        load_data.clear()
-        time.sleep(0.5) 
-    except Exception as e:
-        st.error(f"저장 실패: {e}")
-
-# --- 데이터 추가 ---
-def add_row_to_sheet(row_data, tab_name):
-    try:
-        client = get_gsheet_client()
-        sheet = client.open(SHEET_NAME).worksheet(tab_name)
-        sheet.append_row(row_data)
-        load_data.clear()
-        time.sleep(0.5)
-    except Exception as e:
-        st.error(f"추가 실패: {e}")
-
-# --- AI 이미지 분석 (강력한 추출기로 업그레이드) ---
-# --- AI 이미지 분석 (JSON 강제 모드 + 에러 원인 추적기 탑재) ---
-def analyze_recipe_image_with_ai(api_key, images):
-    genai.configure(api_key=api_key)
-    models = ['gemini-2.5-flash']
-    prompt = """
-    이 음식 사진들을 분석해서 [요리 이름], [필수 재료], [조리법]을 추출해.
-    절대 다른 설명이나 인사말은 하지 말고, 오직 아래 JSON 형식으로만 응답해.
-    {"name": "요리명", "ingredients": "재료1, 재료2", "steps": "조리법"}
-    """
-    
-    last_error = ""
-    for m in models:
-        try:
-            # 🔥 [핵심] 최신 기능: AI가 무조건 JSON 형식으로만 대답하도록 시스템 강제
-            model = genai.GenerativeModel(m, generation_config={"response_mime_type": "application/json"})
-            response = model.generate_content([prompt] + images)
-            
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            
-            try:
-                return json.loads(text)
-            except json.JSONDecodeError:
-                # 혹시라도 파싱 에러가 나면 정규식으로 알맹이만 구출 시도
-                match = re.search(r'\{.*\}', text, re.DOTALL)
-                if match:
-                    return json.loads(match.group(0))
-                else:
-                    raise ValueError(f"JSON 파싱 실패 (응답 일부): {text[:50]}...")
-                    
-        except Exception as e:
-            # 에러가 나면 조용히 넘어가지 않고, last_error 변수에 내용을 적어둡니다.
-            last_error = str(e)
-            continue
-            
-    # 🔥 [핵심] 모든 모델이 실패했다면, 진짜 실패 원인을 화면에 띄워줍니다.
-    st.error(f"🚨 [AI 통신/분석 실패] 상세 원인: {last_error}")
-    return None
-    
-# --- AI 메뉴 추천 ---
-def get_ai_recommendations(api_key, pantry_list, recipe_list, excluded_list):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    pantry_set = normalize_pantry(pantry_list)
-    filtered_recipes = [r for r in recipe_list if r["요리명"] not in excluded_list]
-
-    scored = []
-    for r in filtered_recipes:
-        score = score_recipe(pantry_set, r)
-        if score > 0: scored.append((r, score))
-    scored.sort(key=lambda x: x[1], reverse=True)
-
-    if not scored and filtered_recipes: scored = [(filtered_recipes[0], 0)]
-    elif not scored and not filtered_recipes: return {"recommendations": []}
-
-    top_recipe = scored[0][0]
-    
-    raw_ingredients = [x.strip() for x in str(top_recipe['필수재료']).split(",")]
-    missing_items = [raw_ing for raw_ing in raw_ingredients if not check_is_present(raw_ing, pantry_set)]
-    missing_text = ", ".join(missing_items) if missing_items else "없음 (완벽해요!)"
-
-    prompt = f"""
-    너는 긍정적인 요리 친구야.
-    추천 메뉴: {top_recipe['요리명']}
-    부족한 재료: {missing_text}
-    이 요리를 추천하는 이유를 한 문장으로 긍정적으로 말해줘.
-    출력 형식(JSON):
-    {{ "recommendations": [ {{ "name": "{top_recipe['요리명']}", "reason": "AI의 추천 멘트", "missing": "{missing_text}" }} ] }}
-    """
-    try:
-        response = model.generate_content(prompt)
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match: return json.loads(match.group(0))
-        else: raise ValueError("No JSON")
-    except:
-        return {
-            "recommendations": [
-                {
-                    "name": top_recipe["요리명"],
-                    "reason": "재료 조합상 현재 가장 해먹기 좋은 메뉴입니다! 😋",
-                    "missing": missing_text
-                }
-            ]
-        }
-
-# --- [수정됨] 콜백 함수 (보관장소 처리 추가) ---
-def handle_add_pantry():
-    n = st.session_state.get('input_name', "").strip()
-    d = st.session_state.get('input_date', date.today())
-    is_sauce = st.session_state.get('chk_sauce', False)
-    is_seasoning = st.session_state.get('chk_season', False)
-    storage_raw = st.session_state.get('input_storage', '🧊 냉장고')
-    storage = "냉동실" if "냉동실" in storage_raw else "냉장고"
-
-    if n:
-        final_d = "" if (is_sauce or is_seasoning) else str(d)
-        current_df = load_data(PANTRY_TAB, ["재료명", "유통기한", "보관장소"]) # 컬럼 추가
-        
-        if n in current_df['재료명'].values:
-            current_df.loc[current_df['재료명'] == n, '유통기한'] = final_d
-            current_df.loc[current_df['재료명'] == n, '보관장소'] = storage
-            save_data_overwrite(current_df, PANTRY_TAB)
-            st.session_state['toast_msg'] = f"🔄 '{n}' 정보 업데이트!"
-        else:
-            add_row_to_sheet([n, final_d, storage], PANTRY_TAB)
-            st.session_state['toast_msg'] = f"{storage_raw[:2]} '{n}' {storage}에 쏙!"
-        
-        st.session_state['input_name'] = ""
-        st.session_state['chk_sauce'] = False
-        st.session_state['chk_season'] = False
-    else:
-        st.session_state['warning_msg'] = "재료 이름을 적어주세요!"
-
-# --- 앱 초기 설정 ---
-st.set_page_config(page_title="오늘 뭐 먹지?", page_icon="🍳", layout="wide") 
-apply_cute_style() 
-
-if 'toast_msg' not in st.session_state: st.session_state['toast_msg'] = None
-if 'warning_msg' not in st.session_state: st.session_state['warning_msg'] = None
-if st.session_state['toast_msg']: st.toast(st.session_state['toast_msg'], icon="✅"); st.session_state['toast_msg'] = None
-if st.session_state['warning_msg']: st.warning(st.session_state['warning_msg']); st.session_state['warning_msg'] = None
-
-if 'current_view' not in st.session_state: st.session_state['current_view'] = '요리하기'
-if 'highlight_items' not in st.session_state: st.session_state['highlight_items'] = []
-if 'ai_result' not in st.session_state: st.session_state['ai_result'] = {"name": "", "ingredients": "", "steps": ""}
-if 'ai_recommendation' not in st.session_state: st.session_state['ai_recommendation'] = None
-if 'shown_recipes' not in st.session_state: st.session_state['shown_recipes'] = []
-
-if 'input_name' not in st.session_state: st.session_state['input_name'] = ""
-if 'input_date' not in st.session_state: st.session_state['input_date'] = date.today() + timedelta(days=7)
-
-# --- 사이드바 ---
-with st.sidebar:
-    st.title("🧸 메뉴") 
-    menu_options = ["🍳 요리하기", "🧊 냉장고 관리", "📖 레시피 관리"]
-    view_map = {"🍳 요리하기": "요리하기", "🧊 냉장고 관리": "냉장고 관리", "📖 레시피 관리": "레시피 관리"}
-    current_label = [k for k, v in view_map.items() if v == st.session_state['current_view']][0]
-    selected_label = st.radio("이동하기", menu_options, index=menu_options.index(current_label))
-    if view_map[selected_label] != st.session_state['current_view']:
-        st.session_state['current_view'] = view_map[selected_label]
-        st.rerun()
-
-    st.divider()
-    if "GEMINI_API_KEY" in st.secrets:
-        os.environ["GEMINI_API_KEY"] = st.secrets["GEMINI_API_KEY"]
-        st.success("✨ AI 연결됨")
-    else:
-        api_key_input = st.text_input("🔑 Gemini API Key", type="password")
-        if api_key_input: os.environ["GEMINI_API_KEY"] = api_key_input
-
-    st.write("")
-    if st.button("🔄 추천 순서 리셋"):
-        st.session_state['shown_recipes'] = []
-        st.session_state['ai_recommendation'] = None
-        st.success("처음부터 다시 추천합니다!")
-        st.rerun()
-
-# [수정됨] 보관장소 데이터 로드 및 결측치 처리 (기존 데이터 호환)
-pantry_df = load_data(PANTRY_TAB, ["재료명", "유통기한", "보관장소"])
-if not pantry_df.empty:
-    pantry_df['유통기한'] = pd.to_datetime(pantry_df['유통기한'], errors='coerce').dt.date
-    pantry_df['보관장소'] = pantry_df['보관장소'].replace("", "냉장고").fillna("냉장고")
-
-recipe_df = load_data(RECIPE_TAB, ["요리명", "필수재료", "링크", "조리법"])
-today = date.today()
-
-st.markdown('<div class="main-title">🍳 오늘 뭐 먹지?</div>', unsafe_allow_html=True)
-
-# ==========================================
-# 뷰 1: 요리하기
-# ==========================================
-if st.session_state['current_view'] == "요리하기":
-    st.header("👨‍🍳 AI 셰프의 추천")
-    
-    if pantry_df.empty or recipe_df.empty:
-         st.warning("냉장고가 비었거나 레시피북이 비어있어요! 데이터를 먼저 채워주세요.")
-    else:
-        st.info("💡 파이썬과 AI가 협동해서 최적의 메뉴를 골라줍니다.")
-        btn_text = "🎲 다음 메뉴 추천해줘!" if st.session_state['shown_recipes'] else "🧑‍🍳 AI! 첫 번째 메뉴 추천해줘"
-        
-        if st.button(btn_text, use_container_width=True):
-            with st.spinner("메뉴 선정 중... 🧐"):
-                key = st.secrets.get("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
-                if key:
-                    pantry_list = pantry_df['재료명'].tolist()
-                    recipe_list = recipe_df[['요리명', '필수재료', '링크', '조리법']].to_dict('records')
-                    
-                    result = get_ai_recommendations(key, pantry_list, recipe_list, st.session_state['shown_recipes'])
-                    new_recs = result.get('recommendations', [])
-                    
-                    if not new_recs and st.session_state['shown_recipes']:
-                        st.toast("🔄 한 바퀴 다 돌았네요! 처음부터 다시 추천합니다.")
-                        st.session_state['shown_recipes'] = []
-                        result = get_ai_recommendations(key, pantry_list, recipe_list, [])
-                        new_recs = result.get('recommendations', [])
-
-                    st.session_state['ai_recommendation'] = new_recs
-                    
-                    for r in new_recs:
-                        if r['name'] not in st.session_state['shown_recipes']:
-                            st.session_state['shown_recipes'].append(r['name'])
-                else:
-                    st.error("API 키가 없어요!")
-
-        if st.session_state['ai_recommendation'] is not None:
-            recs = st.session_state['ai_recommendation']
-            if len(recs) == 0:
-                st.warning("🥲 추천할 메뉴가 정말 없어요.")
-            else:
-                for rec in recs:
-                    with st.expander(f"🍽️ **{rec['name']}** (추천!)", expanded=True):
-                        st.markdown(f"**🗣️ AI 의견:** {rec['reason']}")
-                        
-                        missing_info = rec.get('missing', '없음')
-                        if missing_info and missing_info != '없음 (완벽해요!)':
-                             st.markdown(f"""
-                            <div style="background-color:#FFF3E0; padding:10px; border-radius:10px; margin-bottom:10px; border:1px solid #FFCC80;">
-                                ⚠️ <b>부족한 재료:</b> {missing_info} <br>
-                                <span style="font-size:0.8em; color:#666;">(기본 양념이나 부재료는 생략/대체 가능해요!)</span>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        else:
-                            st.success("✨ 모든 재료가 완벽하게 준비되어 있어요!")
-
-                        original_data = recipe_df[recipe_df['요리명'] == rec['name']]
-                        if not original_data.empty:
-                            original = original_data.iloc[0]
-                            st.divider()
-                            
-                            formatted_steps = format_steps(original['조리법'])
-                            st.text(formatted_steps)
-                            
-                            if original['링크']: st.markdown(f"👉 [레시피 링크]({original['링크']})")
-                            
-                            if st.button(f"😋 {rec['name']} 요리 완료! (재료 소진 알림)", key=f"cook_{rec['name']}"):
-                                 st.session_state['highlight_items'] = [x.strip() for x in str(original['필수재료']).split(',')]
-                                 st.session_state['current_view'] = "냉장고 관리"
-                                 st.rerun()
-
-# ==========================================
-# 뷰 2: 냉장고 관리 (냉장고/냉동실 분리)
-# ==========================================
-elif st.session_state['current_view'] == "냉장고 관리":
-    st.header("🧊 우리집 냉장고")
-    c1, c2 = st.columns([1.5, 1])
-    
-    with c1:
-        if st.session_state['highlight_items']:
-            st.error(f"🔥 방금 사용한 재료 (정리 필요): {', '.join(st.session_state['highlight_items'])}")
-            if st.button("알림 끄기"): st.session_state['highlight_items'] = []; st.rerun()
-            
-        # [NEW] 냉장고 / 냉동실 탭 생성
-        tab_fridge, tab_freezer = st.tabs(["🧊 냉장고", "❄️ 냉동실"])
-        
-        # 탭별 재료 렌더링을 위한 반복문
-        for storage_val, current_tab in zip(["냉장고", "냉동실"], [tab_fridge, tab_freezer]):
-            with current_tab:
-                if not pantry_df.empty:
-                    sub_df = pantry_df[pantry_df['보관장소'] == storage_val]
-                    if sub_df.empty:
-                        st.info("비어있습니다! 재료를 채워주세요.")
-                    else:
-                        for idx, row in sub_df.iterrows():
-                            icon = "🔴" if row['재료명'] in st.session_state['highlight_items'] else "🟢"
-                            
-                            if pd.isna(row['유통기한']) or str(row['유통기한']).strip() == "": 
-                                d_day_str = "(소스/조미료)"
-                                display_style = "color:#8D6E63;" 
-                            else:
-                                days_left = (row['유통기한'] - today).days
-                                d_day_str = f"({days_left}일 남음)" if days_left >= 0 else "(지남!!)"
-                                display_style = "color:#FF7043;" if days_left < 3 else "color:#8D6E63;"
-
-                            with st.container(border=True):
-                                sc1, sc2 = st.columns([5, 1])
-                                sc1.markdown(f"**{icon} {row['재료명']}** <span style='{display_style} font-size:0.9em; margin-left:10px;'>{d_day_str}</span>", unsafe_allow_html=True)
-                                with sc2: 
-                                    if st.button("🗑️", key=f"d_{idx}"): 
-                                        pantry_df = pantry_df.drop(idx)
-                                        save_data_overwrite(pantry_df, PANTRY_TAB)
-                                        st.rerun()
-
-    with c2:
-        st.subheader("🛒 재료 채우기")
-        db1, db2 = st.columns([1, 1])
-        if db1.button("📅 +1주"): st.session_state['input_date'] = today + timedelta(weeks=1); st.rerun()
-        if db2.button("📅 +1달"): st.session_state['input_date'] = today + timedelta(days=30); st.rerun()
-        
-        st.text_input("재료명 (필수!)", key="input_name")
-        
-        # [NEW] 보관 장소 선택 (라디오 버튼)
-        st.radio("보관 장소", ["🧊 냉장고", "❄️ 냉동실"], horizontal=True, key="input_storage")
-        
-        c1, c2 = st.columns(2)
-        with c1: st.checkbox("🥫 소스", key="chk_sauce")
-        with c2: st.checkbox("🧂 조미료", key="chk_season")
-        st.date_input("유통기한", key="input_date")
-        
-        st.write("")
-        st.button("✨ 보관함에 넣기", use_container_width=True, on_click=handle_add_pantry)
-
-# ==========================================
-# 뷰 3: 레시피 관리
-# ==========================================
-elif st.session_state['current_view'] == "레시피 관리":
-    st.header("📖 나만의 레시피북")
-    t1, t2 = st.tabs(["➕ 레시피 등록", "📝 목록 보기"])
-    with t1:
-        with st.expander("🤖 사진으로 찰칵! 자동 입력", expanded=True):
-            files = st.file_uploader("요리 사진", accept_multiple_files=True)
-            if files and st.button("🪄 AI 분석"):
-                key = st.secrets.get("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
-                if not key: 
-                    st.error("API 키가 필요합니다!")
-                else:
-                    with st.spinner("AI가 사진을 뚫어져라 분석 중입니다... 🧐"):
-                        imgs = [Image.open(f) for f in files]
-                        res = analyze_recipe_image_with_ai(key, imgs)
-                        
-                        # 🔥 실패했을 때도 사용자에게 알려주기
-                        if res: 
-                            st.session_state['ai_result'] = res
-                            st.success("사진 분석 성공! 아래 폼을 확인해주세요 ✨")
-                            st.rerun()
-                        else:
-                            st.error("😭 AI가 사진에서 레시피를 추출하지 못했어요. 다른 사진으로 시도하거나 직접 입력해주세요!")
-
-        with st.form("rec_form"):
-            default = st.session_state['ai_result']
-            rn = st.text_input("요리 이름", value=default.get('name', ''))
-            ri = st.text_input("필수 재료", value=default.get('ingredients', ''))
-            rs = st.text_area("조리법", value=default.get('steps', ''), height=150)
-            rl = st.text_input("참고 링크")
-            st.write("")
-            if st.form_submit_button("✨ 저장"):
-                add_row_to_sheet([rn, ri, rl, rs], RECIPE_TAB)
-                st.session_state['ai_result'] = {}
-                st.session_state['toast_msg'] = "레시피 저장 완료!"
-                st.rerun()
-    with t2:
-        if not recipe_df.empty:
-            edited = st.data_editor(recipe_df, num_rows="dynamic", use_container_width=True, key="recipe_editor")
-            if st.button("💾 저장"):
-                clean = edited[edited['요리명'].notna() & (edited['요리명'] != "")].drop_duplicates(subset=['요리명', '링크'])
-                save_data_overwrite(clean, RECIPE_TAB); st.session_state['toast_msg'] = "저장 완료!"; st.rerun()
-
-
-
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+import random
+import os
+from collections import Counter
+
+from recipe_engine import PARSED_COLUMNS, ExpiryIndex, RecipeIndex, PantryScoreCache, SharedRecipeIndex, normalize_pantry, parsed_columns, recipe_steps
+from recipe_storage import (
+    PANTRY_TAB, RECIPE_TAB, RECIPE_COLUMNS, SheetConnection, TabCache, SheetWriter, SqliteStore,
+    complete_recipe_row, sheet_rows, write_recipe_snapshot,
+)
+from recipe_ai import (
+    AsyncGeminiClient, BlurbService, JsonDiskCache, RECOMMEND_K,
+    analyze_recipe_images, get_ai_recommendations, preprocess_image,
+)
+from recipe_trace import tracer
+
+# --- 저장소 설정 (sheets: 구글 시트 / sqlite: 로컬 DB + 선택적으로 시트 동기화) ---
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sheets")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "cooking_db.sqlite")
+SHEETS_SYNC = os.environ.get("SHEETS_SYNC", "0") == "1"
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
+
+# --- 냉장고 화면 설정 ---
+PANTRY_PAGE_SIZE = 20
+URGENT_DAYS = 3  # 남은 일수가 이보다 적으면 임박 표시
+SIMILAR_K = 3
+
+# --- [스타일] ---
+def apply_cute_style():
+    st.markdown("""
+        <style>
+        @import url('https://fonts.googleapis.com/css2?family=Gowun+Dodum&display=swap');
+        .stApp { background-color: #FFF9C4 !important; }
+        h1, h2, h3, p, label, div[data-testid="stMarkdownContainer"], div[data-baseweb="select"], li {
+            font-family: 'Gowun Dodum', sans-serif !important;
+            color: #5D4037 !important;
+        }
+        .main-title {
+            font-weight: bold; color: #5D4037; margin-bottom: 20px;
+            font-family: 'Gowun Dodum', sans-serif !important; word-break: keep-all;
+        }
+        @media (min-width: 601px) { .main-title { font-size: 3rem; } }
+        @media (max-width: 600px) { .main-title { font-size: 1.8rem; } h2 { font-size: 1.5rem !important; } }
+        div.stButton > button {
+            border-radius: 20px !important; background: linear-gradient(to bottom right, #FFAB91, #FFCCBC) !important;
+            color: white !important; border: none !important; box-shadow: 2px 2px 5px rgba(0,0,0,0.1) !important;
+            font-family: 'Gowun Dodum', sans-serif !important; font-size: 1.1rem !important; font-weight: bold !important;
+            padding-top: 10px !important; padding-bottom: 10px !important; transition: all 0.2s ease-in-out !important;
+        }
+        div.stButton > button:hover { transform: scale(1.02) !important; background: linear-gradient(to bottom right, #FF8A65, #FFAB91) !important; color: white !important; }
+        div[data-baseweb="input"] > div, div[data-baseweb="textarea"] > div {
+            border-radius: 15px !important; border: 2px solid #FFE082 !important; background-color: #FFFDE7 !important;
+        }
+        section[data-testid="stSidebar"] { background-color: #FFF59D !important; }
+        div[data-testid="stVerticalBlockBorderWrapper"] {
+            border-radius: 15px !important; border: 2px solid #AED581 !important; background-color: #F1F8E9 !important; padding: 15px !important;
+        }
+        div[data-baseweb="radio"] label, div[data-baseweb="checkbox"] label { font-family: 'Gowun Dodum', sans-serif !important; }
+        /* 탭 스타일링 */
+        button[data-baseweb="tab"] { font-family: 'Gowun Dodum', sans-serif !important; font-size: 1.1rem !important; }
+        </style>
+    """, unsafe_allow_html=True)
+
+# --- 구글 시트 연결 ---
+def get_gsheet_client():
+    # 시트 SDK는 실제로 연결할 때만 불러옵니다 (sqlite 백엔드에서는 끝까지 안 불림)
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    creds_dict = dict(st.secrets["gcp_service_account"])
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    client = gspread.authorize(creds)
+    return client
+
+# --- 구글 시트 연결 풀 (인증 클라이언트와 워크시트 핸들을 프로세스 전체에서 재사용) ---
+@st.cache_resource
+def get_sheet_connection():
+    return SheetConnection(get_gsheet_client)
+
+@st.cache_resource
+def get_tab_cache():
+    return TabCache(get_sheet_connection(), CACHE_DIR)
+
+@st.cache_resource
+def get_local_store():
+    if STORAGE_BACKEND != "sqlite": return None
+    store = SqliteStore(SQLITE_PATH)
+    if store.is_empty():
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        store.import_csv(os.path.join(base_dir, "recipes.csv"), os.path.join(base_dir, "pantry.csv"))
+    return store
+
+@st.cache_resource
+def get_sheet_writer():
+    cache = get_tab_cache()
+    return SheetWriter(get_sheet_connection(), cache, on_applied=cache.mark_synced)
+
+# --- 세션 공용 레시피북 (표 + 역색인을 프로세스에 하나만 두고, 원본이 바뀔 때만 새 버전으로 교체) ---
+@st.cache_resource
+def get_shared_recipes():
+    return SharedRecipeIndex()
+
+def recipe_source_key():
+    # 레시피 표를 다시 읽지 않고도 바뀌었는지 알 수 있는 가벼운 버전 값
+    store = get_local_store()
+    if store is not None: return store.revision(RECIPE_TAB)
+    cache = get_tab_cache()
+    cache.read(RECIPE_TAB)
+    return cache.version(RECIPE_TAB), get_sheet_writer().generation(RECIPE_TAB)
+
+def build_recipe_book():
+    recipe_df = load_data(RECIPE_TAB, RECIPE_COLUMNS)
+    with tracer.span("recipe_index.build"): index = RecipeIndex(recipe_df.to_dict('records'))
+    # 배치 추천 등 다른 프로세스가 전처리 없이 바로 읽을 수 있도록 열 스냅샷도 남겨 둡니다
+    try:
+        write_recipe_snapshot(os.path.join(CACHE_DIR, "recipes.arrow"), index.recipes)
+    except OSError:
+        pass
+    return recipe_df, index
+
+def get_recipe_book():
+    # 돌려받은 표와 색인은 모든 세션이 같이 보므로 제자리 수정 금지 (복사본을 만들어 쓰기)
+    return get_shared_recipes().get(recipe_source_key, build_recipe_book)
+
+def publish_recipe_book():
+    # 레시피를 쓴 세션이 새 버전을 만들어 올려 두면, 다른 세션은 기다림 없이 다음 실행에서 바로 씁니다
+    get_shared_recipes().refresh(recipe_source_key, build_recipe_book)
+
+# --- 세션별 점수 캐시 (레시피북이나 냉장고가 밖에서 바뀌었으면 새로 생성) ---
+def get_score_cache(recipe_index, pantry_list):
+    cache = st.session_state.get('score_cache')
+    if cache is None or cache.index is not recipe_index or cache.items != Counter(pantry_list):
+        with tracer.span("score_cache.build"): cache = PantryScoreCache(recipe_index, pantry_list)
+        st.session_state['score_cache'] = cache
+    return cache
+
+# --- 비슷한 레시피 중복 검사 (이름만 바꾼 복사본도 재료가 같으면 잡아냅니다) ---
+def find_near_duplicates(recipe_index, recipes, kept=None):
+    # recipes: (레시피북 번호 또는 새 행이면 None, 레시피) 목록. 자기 자신과 지워질 행은 비교에서 뺍니다
+    removed = [] if kept is None else [i for i in range(len(recipe_index.recipes)) if i not in kept]
+    found = []
+    with tracer.span("similar.duplicates"):
+        similarity = recipe_index.similarity()
+        for pos, recipe in recipes:
+            skip = removed + ([] if pos is None else [pos])
+            found += [(recipe['요리명'], dup['요리명'], score) for dup, score in similarity.near_duplicates(recipe, skip=skip)]
+    return found
+
+def confirm_duplicates(found):
+    # 처음 누르면 경고만 하고, 같은 중복 목록으로 한 번 더 누르면 그대로 저장합니다
+    if not found or st.session_state.get('dup_confirm') == found:
+        st.session_state['dup_confirm'] = None
+        return True
+    st.session_state['dup_confirm'] = found
+    pairs = "\n".join(f"- **{new}** ↔ {old} ({score:.0%})" for new, old, score in found)
+    st.warning(f"⚠️ 재료가 거의 같은 레시피가 이미 있어요!\n{pairs}\n\n그래도 저장하려면 한 번 더 눌러주세요.")
+    return False
+
+# --- 데이터 로드 (탭 캐시 + 아직 안 써진 변경분) ---
+def load_data(tab_name, columns):
+    with tracer.span(f"load_data.{tab_name}"):
+        store = get_local_store()
+        if store is not None: return store.load(tab_name, columns)
+        get_tab_cache().read(tab_name)
+        return get_sheet_writer().overlay(tab_name, columns)
+
+# --- 레시피 전처리 열 채우기 (저장된 값이 원문과 맞으면 재사용) ---
+def with_parsed_columns(df):
+    parsed = [parsed_columns(r) for r in df.to_dict('records')]
+    return df.assign(**{c: [p[c] for p in parsed] for c in PARSED_COLUMNS})[RECIPE_COLUMNS]
+
+# --- 데이터 저장 ---
+def save_data_overwrite(df, tab_name):
+    df_save = df.copy().fillna("")
+    if tab_name == RECIPE_TAB: df_save = with_parsed_columns(df_save)
+    if '유통기한' in df_save.columns:
+        df_save['유통기한'] = df_save['유통기한'].apply(lambda x: "" if pd.isna(x) or str(x) == "NaT" else str(x))
+    store = get_local_store()
+    if store is not None:
+        store.save_rows(sheet_rows(df_save), tab_name)
+        # 레시피는 (요리명, 링크)가 같은 행 중 먼저 들어온 것만 남기고, 시트에도 지운 결과를 보냅니다
+        if tab_name == RECIPE_TAB and store.dedupe_recipes(): df_save = store.load(RECIPE_TAB, RECIPE_COLUMNS)
+    if store is None or SHEETS_SYNC: get_sheet_writer().save(sheet_rows(df_save), tab_name)
+    if tab_name == RECIPE_TAB: publish_recipe_book()
+
+# --- 데이터 추가 ---
+def add_row_to_sheet(row_data, tab_name):
+    if tab_name == RECIPE_TAB: row_data = complete_recipe_row(row_data)
+    store = get_local_store()
+    if store is not None: store.append(row_data, tab_name)
+    if store is None or SHEETS_SYNC:
+        snapshot = get_tab_cache().get(tab_name)
+        if tab_name == RECIPE_TAB and snapshot and snapshot[0] != RECIPE_COLUMNS:
+            # 전처리 열이 없는 예전 시트는 이번에 한 번 전체 저장해서 헤더까지 맞춥니다
+            df = load_data(RECIPE_TAB, RECIPE_COLUMNS)
+            if store is None: df = pd.concat([df, pd.DataFrame([row_data], columns=RECIPE_COLUMNS)], ignore_index=True)
+            get_sheet_writer().save(sheet_rows(with_parsed_columns(df.fillna(""))), tab_name)
+        else:
+            get_sheet_writer().append(row_data, tab_name)
+    if tab_name == RECIPE_TAB: publish_recipe_book()
+
+@st.cache_resource
+def get_analysis_cache():
+    return JsonDiskCache(os.path.join(CACHE_DIR, "image_analysis.sqlite"), max_entries=200, ttl=30 * 24 * 3600)
+
+@st.cache_resource
+def get_gemini_client():
+    return AsyncGeminiClient()
+
+# --- AI 이미지 분석 (JSON 강제 모드 + 에러 원인 추적기 탑재) ---
+def analyze_recipe_image_with_ai(api_key, images):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    try:
+        return analyze_recipe_images(get_gemini_client(), get_analysis_cache(), images)
+    except Exception as e:
+        # 🔥 [핵심] 모든 모델이 실패했다면, 진짜 실패 원인을 화면에 띄워줍니다.
+        st.error(f"🚨 [AI 통신/분석 실패] 상세 원인: {e}")
+        return None
+
+@st.cache_resource
+def get_blurb_service():
+    return BlurbService(JsonDiskCache(os.path.join(CACHE_DIR, "blurbs.sqlite")), get_gemini_client())
+
+# --- 디버그 패널 (이번 실행의 구간별 시간과 호출 횟수) ---
+def render_trace_panel(trace):
+    with st.expander(f"🐞 이번 실행 {trace['total_ms']:.0f}ms"):
+        spans = sorted(trace['spans'].items(), key=lambda kv: -kv[1]['ms'])
+        st.dataframe(pd.DataFrame([{"구간": n, "횟수": s['count'], "ms": s['ms']} for n, s in spans]), hide_index=True)
+        if trace['counters']: st.caption(" · ".join(f"{k} {v}" for k, v in sorted(trace['counters'].items())))
+        st.caption("프로세스 누적 (백그라운드 시트 쓰기 sheets.write는 실행이 끝난 뒤 반영돼 여기에만 잡힘): " + " · ".join(f"{k} {v}" for k, v in sorted(tracer.totals.items())))
+
+# --- [수정됨] 콜백 함수 (보관장소 처리 추가) ---
+def handle_add_pantry():
+    n = st.session_state.get('input_name', "").strip()
+    d = st.session_state.get('input_date', date.today())
+    is_sauce = st.session_state.get('chk_sauce', False)
+    is_seasoning = st.session_state.get('chk_season', False)
+    storage_raw = st.session_state.get('input_storage', '🧊 냉장고')
+    storage = "냉동실" if "냉동실" in storage_raw else "냉장고"
+
+    if n:
+        final_d = "" if (is_sauce or is_seasoning) else str(d)
+        current_df = load_data(PANTRY_TAB, ["재료명", "유통기한", "보관장소"]) # 컬럼 추가
+        
+        if n in current_df['재료명'].values:
+            current_df.loc[current_df['재료명'] == n, '유통기한'] = final_d
+            current_df.loc[current_df['재료명'] == n, '보관장소'] = storage
+            save_data_overwrite(current_df, PANTRY_TAB)
+            st.session_state['toast_msg'] = f"🔄 '{n}' 정보 업데이트!"
+        else:
+            add_row_to_sheet([n, final_d, storage], PANTRY_TAB)
+            if st.session_state.get('score_cache') is not None: st.session_state['score_cache'].add(n)
+            st.session_state['toast_msg'] = f"{storage_raw[:2]} '{n}' {storage}에 쏙!"
+        
+        st.session_state['input_name'] = ""
+        st.session_state['chk_sauce'] = False
+        st.session_state['chk_season'] = False
+    else:
+        st.session_state['warning_msg'] = "재료 이름을 적어주세요!"
+
+# --- 앱 초기 설정 ---
+st.set_page_config(page_title="오늘 뭐 먹지?", page_icon="🍳", layout="wide") 
+apply_cute_style() 
+
+# 실행 추적 (RECIPE_TRACE=1 일 때만). 이전 실행이 st.rerun()으로 중간에 끊겼으면 여기서 닫습니다
+if st.session_state.get('trace_run') is not None: tracer.end_run(st.session_state['trace_run'], status="interrupted")
+st.session_state['trace_run'] = tracer.begin_run(st.session_state.get('current_view', ''))
+
+if 'toast_msg' not in st.session_state: st.session_state['toast_msg'] = None
+if 'warning_msg' not in st.session_state: st.session_state['warning_msg'] = None
+if st.session_state['toast_msg']: st.toast(st.session_state['toast_msg'], icon="✅"); st.session_state['toast_msg'] = None
+if st.session_state['warning_msg']: st.warning(st.session_state['warning_msg']); st.session_state['warning_msg'] = None
+for err in get_sheet_writer().take_errors(): st.error(f"저장 실패: {err}")
+
+if 'current_view' not in st.session_state: st.session_state['current_view'] = '요리하기'
+if 'highlight_items' not in st.session_state: st.session_state['highlight_items'] = []
+if 'ai_result' not in st.session_state: st.session_state['ai_result'] = {"name": "", "ingredients": "", "steps": ""}
+if 'ai_recommendation' not in st.session_state: st.session_state['ai_recommendation'] = None
+if 'shown_recipes' not in st.session_state: st.session_state['shown_recipes'] = []
+if 'pantry_trash' not in st.session_state: st.session_state['pantry_trash'] = {}
+if 'dup_confirm' not in st.session_state: st.session_state['dup_confirm'] = None
+
+if 'input_name' not in st.session_state: st.session_state['input_name'] = ""
+if 'input_date' not in st.session_state: st.session_state['input_date'] = date.today() + timedelta(days=7)
+
+# --- 사이드바 ---
+with st.sidebar:
+    st.title("🧸 메뉴") 
+    menu_options = ["🍳 요리하기", "🧊 냉장고 관리", "📖 레시피 관리"]
+    view_map = {"🍳 요리하기": "요리하기", "🧊 냉장고 관리": "냉장고 관리", "📖 레시피 관리": "레시피 관리"}
+    current_label = [k for k, v in view_map.items() if v == st.session_state['current_view']][0]
+    selected_label = st.radio("이동하기", menu_options, index=menu_options.index(current_label))
+    if view_map[selected_label] != st.session_state['current_view']:
+        st.session_state['current_view'] = view_map[selected_label]
+        st.rerun()
+
+    st.divider()
+    if "GEMINI_API_KEY" in st.secrets:
+        os.environ["GEMINI_API_KEY"] = st.secrets["GEMINI_API_KEY"]
+        st.success("✨ AI 연결됨")
+    else:
+        api_key_input = st.text_input("🔑 Gemini API Key", type="password")
+        if api_key_input: os.environ["GEMINI_API_KEY"] = api_key_input
+
+    st.write("")
+    if st.button("🔄 추천 순서 리셋"):
+        st.session_state['shown_recipes'] = []
+        st.session_state['ai_recommendation'] = None
+        st.success("처음부터 다시 추천합니다!")
+        st.rerun()
+
+    trace_box = st.empty() if tracer.enabled else None
+
+# [수정됨] 보관장소 데이터 로드 및 결측치 처리 (기존 데이터 호환)
+today = date.today()
+pantry_df = load_data(PANTRY_TAB, ["재료명", "유통기한", "보관장소"])
+pantry_days = pd.Series(dtype=float)
+if not pantry_df.empty:
+    with tracer.span("pantry.to_datetime"):
+        expiry = pd.to_datetime(pantry_df['유통기한'], errors='coerce')
+        pantry_df['유통기한'] = expiry.dt.date
+        # 남은 일수는 불러올 때 열 단위로 한 번만 계산합니다 (날짜 없으면 NaN)
+        pantry_days = (expiry - pd.Timestamp(today)).dt.days
+    pantry_df['보관장소'] = pantry_df['보관장소'].replace("", "냉장고").fillna("냉장고")
+
+recipe_df, recipe_index = get_recipe_book()
+
+st.markdown('<div class="main-title">🍳 오늘 뭐 먹지?</div>', unsafe_allow_html=True)
+
+# ==========================================
+# 뷰 1: 요리하기
+# ==========================================
+if st.session_state['current_view'] == "요리하기":
+    st.header("👨‍🍳 AI 셰프의 추천")
+    
+    if pantry_df.empty or recipe_df.empty:
+         st.warning("냉장고가 비었거나 레시피북이 비어있어요! 데이터를 먼저 채워주세요.")
+    else:
+        st.info("💡 파이썬과 AI가 협동해서 최적의 메뉴를 골라줍니다.")
+        btn_text = "🎲 다음 메뉴 추천해줘!" if st.session_state['shown_recipes'] else "🧑‍🍳 AI! 첫 번째 메뉴 추천해줘"
+        
+        if st.button(btn_text, use_container_width=True):
+            with st.spinner("메뉴 선정 중... 🧐"):
+                key = st.secrets.get("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
+                if key:
+                    pantry_list = pantry_df['재료명'].tolist()
+                    recipe_list = recipe_index.recipes
+                    score_cache = get_score_cache(recipe_index, pantry_list)
+
+                    # AI 멘트가 도착하는 대로 먼저 보여줍니다
+                    stream_box = st.empty()
+                    arrived = {}
+                    def show_arrived(i, rec):
+                        arrived[i] = rec
+                        stream_box.markdown("\n\n".join(f"🍽️ **{r['name']}** — {r['reason']}" for _, r in sorted(arrived.items())))
+                    
+                    result = get_ai_recommendations(key, pantry_list, recipe_list, st.session_state['shown_recipes'], recipe_index, score_cache, get_blurb_service(), k=RECOMMEND_K, on_result=show_arrived)
+                    new_recs = result.get('recommendations', [])
+                    
+                    if not new_recs and st.session_state['shown_recipes']:
+                        st.toast("🔄 한 바퀴 다 돌았네요! 처음부터 다시 추천합니다.")
+                        st.session_state['shown_recipes'] = []
+                        result = get_ai_recommendations(key, pantry_list, recipe_list, [], recipe_index, score_cache, get_blurb_service(), k=RECOMMEND_K, on_result=show_arrived)
+                        new_recs = result.get('recommendations', [])
+                    stream_box.empty()
+
+                    st.session_state['ai_recommendation'] = new_recs
+                    
+                    for r in new_recs:
+                        if r['name'] not in st.session_state['shown_recipes']:
+                            st.session_state['shown_recipes'].append(r['name'])
+                else:
+                    st.error("API 키가 없어요!")
+
+        if st.session_state['ai_recommendation'] is not None:
+            recs = st.session_state['ai_recommendation']
+            if len(recs) == 0:
+                st.warning("🥲 추천할 메뉴가 정말 없어요.")
+            else:
+                for rec in recs:
+                    with st.expander(f"🍽️ **{rec['name']}** (추천!)", expanded=True):
+                        st.markdown(f"**🗣️ AI 의견:** {rec['reason']}")
+                        if rec.get('fallback') == 'timeout': st.caption("⏱️ AI 응답이 늦어서 기본 멘트를 보여드려요.")
+                        
+                        missing_info = rec.get('missing', '없음')
+                        if missing_info and missing_info != '없음 (완벽해요!)':
+                             st.markdown(f"""
+                            <div style="background-color:#FFF3E0; padding:10px; border-radius:10px; margin-bottom:10px; border:1px solid #FFCC80;">
+                                ⚠️ <b>부족한 재료:</b> {missing_info} <br>
+                                <span style="font-size:0.8em; color:#666;">(기본 양념이나 부재료는 생략/대체 가능해요!)</span>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.success("✨ 모든 재료가 완벽하게 준비되어 있어요!")
+
+                        original_data = recipe_df[recipe_df['요리명'] == rec['name']]
+                        if not original_data.empty:
+                            original = original_data.iloc[0]
+                            st.divider()
+                            
+                            formatted_steps = recipe_steps(original)
+                            st.text(formatted_steps)
+                            
+                            if original['링크']: st.markdown(f"👉 [레시피 링크]({original['링크']})")
+
+                            with tracer.span("similar.recipes"): similar = recipe_index.similarity().similar_recipes(original.to_dict(), k=SIMILAR_K)
+                            if similar: st.caption("🔗 비슷한 레시피: " + ", ".join(f"{r['요리명']} ({score:.0%})" for r, score in similar))
+                            
+                            if st.button(f"😋 {rec['name']} 요리 완료! (재료 소진 알림)", key=f"cook_{rec['name']}"):
+                                 st.session_state['highlight_items'] = [x.strip() for x in str(original['필수재료']).split(',')]
+                                 st.session_state['current_view'] = "냉장고 관리"
+                                 st.rerun()
+
+        # 냉장고 재료와 가장 닮은 레시피 (추천과 별개로 재료 겹침만 봅니다)
+        with st.expander("🧊 지금 냉장고랑 닮은 레시피"):
+            with tracer.span("similar.pantry"): similar = recipe_index.similarity().similar_to_pantry(normalize_pantry(pantry_df['재료명'].tolist()), k=SIMILAR_K)
+            for r, score in similar: st.markdown(f"- **{r['요리명']}** ({score:.0%})")
+            if not similar: st.caption("겹치는 재료가 있는 레시피가 없어요.")
+
+# ==========================================
+# 뷰 2: 냉장고 관리 (냉장고/냉동실 분리)
+# ==========================================
+elif st.session_state['current_view'] == "냉장고 관리":
+    st.header("🧊 우리집 냉장고")
+    c1, c2 = st.columns([1.5, 1])
+    
+    with c1:
+        if st.session_state['highlight_items']:
+            st.error(f"🔥 방금 사용한 재료 (정리 필요): {', '.join(st.session_state['highlight_items'])}")
+            if st.button("알림 끄기"): st.session_state['highlight_items'] = []; st.rerun()
+            
+        # 유통기한 임박/지남 요약 (정렬된 색인에서 이분 탐색으로 바로 꺼냅니다)
+        if not pantry_df.empty:
+            expiry_index = ExpiryIndex(pantry_df.index, pantry_days)
+            expired = pantry_df.loc[expiry_index.expired(), '재료명'].tolist()
+            urgent = pantry_df.loc[expiry_index.expiring_within(URGENT_DAYS - 1), '재료명'].tolist()
+            if expired: st.warning(f"⛔ 유통기한 지난 재료: {', '.join(expired)}")
+            if urgent: st.info(f"⏰ {URGENT_DAYS}일 안에 먹어야 해요: {', '.join(urgent)}")
+
+        # 🗑️로 고른 재료는 행 번호로 모아 두었다가 한 번에 저장합니다 (클릭마다 전체 저장하지 않음)
+        # 이름이 같은 재료가 여러 개여도 고른 행만 지우고, 그 사이 시트가 바뀌어 행 번호가 어긋난 것은 버립니다
+        trash = st.session_state['pantry_trash']
+        for idx, name in list(trash.items()):
+            if idx not in pantry_df.index or pantry_df.at[idx, '재료명'] != name: del trash[idx]
+        if trash:
+            tc1, tc2 = st.columns([3, 1])
+            if tc1.button(f"🗑️ 고른 재료 {len(trash)}개 한 번에 비우기", use_container_width=True):
+                removed = pantry_df.index.isin(list(trash))
+                if st.session_state.get('score_cache') is not None:
+                    for name in pantry_df.loc[removed, '재료명']: st.session_state['score_cache'].remove(name)
+                save_data_overwrite(pantry_df[~removed], PANTRY_TAB)
+                st.session_state['pantry_trash'] = {}
+                st.session_state['toast_msg'] = f"🗑️ {int(removed.sum())}개 비웠어요!"
+                st.rerun()
+            if tc2.button("↩️ 취소", use_container_width=True):
+                st.session_state['pantry_trash'] = {}; st.rerun()
+
+        # [NEW] 냉장고 / 냉동실 탭 생성
+        tab_fridge, tab_freezer = st.tabs(["🧊 냉장고", "❄️ 냉동실"])
+        
+        # 탭별 재료 렌더링을 위한 반복문
+        for storage_val, current_tab in zip(["냉장고", "냉동실"], [tab_fridge, tab_freezer]):
+            with current_tab:
+                if not pantry_df.empty:
+                    in_tab = pantry_df['보관장소'] == storage_val
+                    # 급한 순서(유통기한 색인 순) → 날짜 없는 소스/조미료 순으로 보여줍니다
+                    order = [k for k in expiry_index.keys if in_tab[k]] + pantry_df.index[in_tab & pantry_days.isna()].tolist()
+                    if not order:
+                        st.info("비어있습니다! 재료를 채워주세요.")
+                    else:
+                        pages = -(-len(order) // PANTRY_PAGE_SIZE)
+                        page_key = f"pantry_page_{storage_val}"
+                        if st.session_state.get(page_key, 1) > pages: st.session_state[page_key] = pages
+                        if pages > 1: st.number_input(f"페이지 (전체 {len(order)}개)", min_value=1, max_value=pages, key=page_key)
+                        start = (st.session_state.get(page_key, 1) - 1) * PANTRY_PAGE_SIZE
+
+                        for idx in order[start:start + PANTRY_PAGE_SIZE]:
+                            row = pantry_df.loc[idx]
+                            icon = "🔴" if row['재료명'] in st.session_state['highlight_items'] else "🟢"
+                            days_left = pantry_days[idx]
+                            
+                            if pd.isna(days_left): 
+                                d_day_str = "(소스/조미료)"
+                                display_style = "color:#8D6E63;" 
+                            else:
+                                d_day_str = f"({int(days_left)}일 남음)" if days_left >= 0 else "(지남!!)"
+                                display_style = "color:#FF7043;" if days_left < URGENT_DAYS else "color:#8D6E63;"
+
+                            in_trash = idx in trash
+                            name_md = f"~~{row['재료명']}~~" if in_trash else f"**{icon} {row['재료명']}**"
+                            with st.container(border=True):
+                                sc1, sc2 = st.columns([5, 1])
+                                sc1.markdown(f"{name_md} <span style='{display_style} font-size:0.9em; margin-left:10px;'>{d_day_str}</span>", unsafe_allow_html=True)
+                                with sc2: 
+                                    if st.button("↩️" if in_trash else "🗑️", key=f"d_{idx}"): 
+                                        if in_trash: del trash[idx]
+                                        else: trash[idx] = row['재료명']
+                                        st.rerun()
+
+    with c2:
+        st.subheader("🛒 재료 채우기")
+        db1, db2 = st.columns([1, 1])
+        if db1.button("📅 +1주"): st.session_state['input_date'] = today + timedelta(weeks=1); st.rerun()
+        if db2.button("📅 +1달"): st.session_state['input_date'] = today + timedelta(days=30); st.rerun()
+        
+        st.text_input("재료명 (필수!)", key="input_name")
+        
+        # [NEW] 보관 장소 선택 (라디오 버튼)
+        st.radio("보관 장소", ["🧊 냉장고", "❄️ 냉동실"], horizontal=True, key="input_storage")
+        
+        c1, c2 = st.columns(2)
+        with c1: st.checkbox("🥫 소스", key="chk_sauce")
+        with c2: st.checkbox("🧂 조미료", key="chk_season")
+        st.date_input("유통기한", key="input_date")
+        
+        st.write("")
+        st.button("✨ 보관함에 넣기", use_container_width=True, on_click=handle_add_pantry)
+
+# ==========================================
+# 뷰 3: 레시피 관리
+# ==========================================
+elif st.session_state['current_view'] == "레시피 관리":
+    st.header("📖 나만의 레시피북")
+    t1, t2 = st.tabs(["➕ 레시피 등록", "📝 목록 보기"])
+    with t1:
+        with st.expander("🤖 사진으로 찰칵! 자동 입력", expanded=True):
+            files = st.file_uploader("요리 사진", accept_multiple_files=True)
+            if files and st.button("🪄 AI 분석"):
+                key = st.secrets.get("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
+                if not key: 
+                    st.error("API 키가 필요합니다!")
+                else:
+                    with st.spinner("AI가 사진을 뚫어져라 분석 중입니다... 🧐"):
+                        with tracer.span("image.preprocess"): imgs = [preprocess_image(f.getvalue()) for f in files]
+                        res = analyze_recipe_image_with_ai(key, imgs)
+                        
+                        # 🔥 실패했을 때도 사용자에게 알려주기
+                        if res: 
+                            st.session_state['ai_result'] = res
+                            st.success("사진 분석 성공! 아래 폼을 확인해주세요 ✨")
+                            st.rerun()
+                        else:
+                            st.error("😭 AI가 사진에서 레시피를 추출하지 못했어요. 다른 사진으로 시도하거나 직접 입력해주세요!")
+
+        with st.form("rec_form"):
+            default = st.session_state['ai_result']
+            rn = st.text_input("요리 이름", value=default.get('name', ''))
+            ri = st.text_input("필수 재료", value=default.get('ingredients', ''))
+            rs = st.text_area("조리법", value=default.get('steps', ''), height=150)
+            rl = st.text_input("참고 링크")
+            st.write("")
+            if st.form_submit_button("✨ 저장") and confirm_duplicates(find_near_duplicates(recipe_index, [(None, {"요리명": rn, "필수재료": ri})])):
+                add_row_to_sheet([rn, ri, rl, rs], RECIPE_TAB)
+                st.session_state['ai_result'] = {}
+                st.session_state['toast_msg'] = "레시피 저장 완료!"
+                st.rerun()
+    with t2:
+        if not recipe_df.empty:
+            # 전처리 열은 숨기고 원문만 편집합니다 (저장할 때 바뀐 행만 다시 계산)
+            edited = st.data_editor(recipe_df.drop(columns=PARSED_COLUMNS), num_rows="dynamic", use_container_width=True, key="recipe_editor")
+            if st.button("💾 저장"):
+                edited = edited.join(recipe_df[PARSED_COLUMNS])
+                clean = edited[edited['요리명'].notna() & (edited['요리명'] != "")]
+                # (요리명, 링크) 중복은 로컬 DB면 저장하면서 SQL로, 시트면 여기서 지웁니다
+                if get_local_store() is None: clean = clean.drop_duplicates(subset=['요리명', '링크'])
+                # 새로 넣거나 이름/재료를 고친 행만 나머지 레시피북과 비교합니다
+                changed = [(pos if pos in recipe_df.index else None, r) for pos, r in clean[~clean.duplicated(subset=['요리명', '링크'])].fillna("").iterrows()
+                           if pos not in recipe_df.index or (r['요리명'], r['필수재료']) != (recipe_df.at[pos, '요리명'], recipe_df.at[pos, '필수재료'])]
+                if confirm_duplicates(find_near_duplicates(recipe_index, changed, kept=set(clean.index))):
+                    save_data_overwrite(clean, RECIPE_TAB); st.session_state['toast_msg'] = "저장 완료!"; st.rerun()
+
+# --- 실행 추적 마무리 ---
+trace = tracer.end_run(st.session_state.pop('trace_run', None))
+if trace_box is not None and trace is not None:
+    with trace_box.container(): render_trace_panel(trace)
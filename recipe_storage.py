@@ -0,0 +1,644 @@
+import difflib
+import heapq
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from recipe_engine import IGNORABLE_INGREDIENTS, PARSED_COLUMNS, PORK_EQUIVALENTS, AhoCorasick, char_postings, parsed_columns, recipe_tokens, tokens_containing
+from recipe_trace import tracer
+
+# --- 구글 시트 설정 ---
+SHEET_NAME = "cooking_db"
+PANTRY_TAB = "pantry"
+RECIPE_TAB = "recipes"
+PANTRY_COLUMNS = ["재료명", "유통기한", "보관장소"]
+RECIPE_COLUMNS = ["요리명", "필수재료", "링크", "조리법"] + PARSED_COLUMNS
+
+def complete_recipe_row(values):
+    # [요리명, 필수재료, 링크, 조리법(, 재료토큰, 조리순서)] → 전처리 열까지 채운 행
+    values = [str(v) for v in values] + [""] * (len(RECIPE_COLUMNS) - len(values))
+    recipe = dict(zip(RECIPE_COLUMNS, values))
+    recipe.update(parsed_columns(recipe))
+    return [recipe[c] for c in RECIPE_COLUMNS]
+
+# --- 구글 시트 연결 풀 (인증 클라이언트와 워크시트 핸들을 프로세스 전체에서 재사용) ---
+class SheetConnection:
+    TOKEN_TTL = 45 * 60  # 액세스 토큰(1시간)이 만료되기 전에 미리 재인증
+
+    def __init__(self, client_factory, sheet_name=SHEET_NAME, token_ttl=TOKEN_TTL, clock=time.monotonic):
+        self.client_factory = client_factory
+        self.sheet_name = sheet_name
+        self.token_ttl = token_ttl
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.client = None
+        self.authorized_at = 0.0
+        self.spreadsheet = None
+        self.worksheets = {}
+
+    def get_client(self):
+        with self.lock:
+            if self.client is None or self.clock() - self.authorized_at >= self.token_ttl:
+                tracer.count("sheets.auth")
+                with tracer.span("sheets.auth"): self.client = self.client_factory()
+                self.authorized_at = self.clock()
+                self.spreadsheet = None
+                self.worksheets = {}
+            return self.client
+
+    def worksheet(self, tab_name):
+        with self.lock:
+            client = self.get_client()
+            if tab_name not in self.worksheets:
+                tracer.count("sheets.open")
+                with tracer.span("sheets.open"):
+                    if self.spreadsheet is None: self.spreadsheet = client.open(self.sheet_name)
+                    self.worksheets[tab_name] = self.spreadsheet.worksheet(tab_name)
+            return self.worksheets[tab_name]
+
+    def revision(self):
+        # 드라이브 메타데이터의 수정 시각만 가져오는 가벼운 호출 (시트 전체를 읽지 않음)
+        with self.lock:
+            client = self.get_client()
+            tracer.count("sheets.get_lastUpdateTime")
+            with tracer.span("sheets.get_lastUpdateTime"):
+                if self.spreadsheet is None: self.spreadsheet = client.open(self.sheet_name)
+                return self.spreadsheet.get_lastUpdateTime()
+
+    def invalidate(self, tab_name=None):
+        # 호출이 실패하면 해당 핸들만 버리고, 탭을 지정하지 않으면 인증부터 다시 합니다
+        with self.lock:
+            if tab_name is None:
+                self.client = None
+                self.spreadsheet = None
+                self.worksheets = {}
+            else:
+                self.worksheets.pop(tab_name, None)
+
+def sheet_rows(df):
+    return [df.columns.values.tolist()] + df.values.tolist()
+
+def records_to_rows(records):
+    # get_all_records() 결과를 [헤더] + 행 목록으로 (pandas 없이)
+    if not records: return None
+    header = list(records[0].keys())
+    return [header] + [[rec.get(h, "") for h in header] for rec in records]
+
+def rows_to_frame(rows, columns):
+    import pandas as pd
+    if not rows or len(rows) < 2: return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(rows[1:], columns=rows[0])
+    for col in columns:
+        if col not in df.columns: df[col] = ""
+    return df[columns]
+
+# --- 레시피 열 스냅샷 (Arrow IPC 파일, 메모리 맵으로 열어서 문자열 전처리 없이 바로 로드) ---
+# pyarrow는 streamlit이 함께 설치하지만, 없으면 스냅샷만 건너뜁니다
+def write_recipe_snapshot(path, recipes):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+    rows = [{**r, **parsed_columns(r)} for r in recipes]
+    table = pa.table({c: [str(r.get(c) or "") for r in rows] for c in RECIPE_COLUMNS})
+    if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return True
+
+def read_recipe_snapshot(path):
+    import pyarrow as pa
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pylist()
+
+# --- 탭별 읽기 캐시 (버전 관리 + 수정 시각으로 원격 변경 감지 + 디스크 보관) ---
+class TabCache:
+    CHECK_INTERVAL = 30  # 이 시간 안에는 네트워크를 전혀 쓰지 않습니다
+
+    def __init__(self, connection, cache_dir=None, check_interval=CHECK_INTERVAL, clock=time.monotonic):
+        self.connection = connection
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.remote_revision = None
+        self.revision_checked_at = None
+
+    def _path(self, tab_name):
+        return os.path.join(self.cache_dir, f"{tab_name}.json")
+
+    def _load_disk(self, tab_name):
+        if not self.cache_dir: return None
+        try:
+            with open(self._path(tab_name), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry["checked_at"] = None
+        return entry
+
+    def _save_disk(self, tab_name, entry):
+        if not self.cache_dir: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._path(tab_name) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({k: entry[k] for k in ("version", "modified", "rows")}, f, ensure_ascii=False)
+            os.replace(tmp, self._path(tab_name))
+        except OSError:
+            pass
+
+    def _revision(self):
+        # 네트워크 호출은 잠금 밖에서 하고, 받은 값만 잠금 안에서 기록합니다
+        with self.lock:
+            now = self.clock()
+            if self.revision_checked_at is not None and now - self.revision_checked_at < self.check_interval:
+                return self.remote_revision
+        modified = self.connection.revision()
+        with self.lock:
+            self.remote_revision, self.revision_checked_at = modified, now
+        return modified
+
+    def _store(self, tab_name, rows, modified):
+        old = self.entries.get(tab_name) or self._load_disk(tab_name)
+        # 내용이 그대로면 버전을 올리지 않습니다 (버전이 바뀌면 레시피 색인을 다시 만듭니다)
+        version = old["version"] if old else 0
+        if old is None or old["rows"] != rows: version += 1
+        entry = {"version": version, "modified": modified, "rows": rows, "checked_at": self.clock()}
+        self.entries[tab_name] = entry
+        self._save_disk(tab_name, entry)
+        return entry
+
+    def read(self, tab_name):
+        with self.lock:
+            entry = self.entries.get(tab_name)
+            if entry is None:
+                entry = self._load_disk(tab_name)
+                if entry is not None: self.entries[tab_name] = entry
+            if entry is not None and entry["checked_at"] is not None and self.clock() - entry["checked_at"] < self.check_interval:
+                tracer.count("tab_cache.hit")
+                return entry["rows"]
+            known = entry["modified"] if entry else None
+        # 시트 확인과 읽기는 잠금 밖에서 합니다 (느린 네트워크가 다른 탭 읽기·쓰기 반영을 막지 않게)
+        try:
+            modified = self._revision()
+            data = None
+            if entry is None or known is None or known != modified:
+                tracer.count("tab_cache.miss")
+                tracer.count("sheets.get_all_records")
+                with tracer.span("sheets.get_all_records"): data = self.connection.worksheet(tab_name).get_all_records()
+            else: tracer.count("tab_cache.revalidated")
+        except Exception:
+            tracer.count("tab_cache.offline")
+            # 오프라인이거나 시트 오류면 마지막으로 성공한 스냅샷(디스크 포함)을 그대로 쓰고,
+            # 확인한 것으로 쳐서 check_interval 동안은 다시 시도하지 않습니다
+            self.connection.invalidate(tab_name)
+            with self.lock:
+                entry = self.entries.get(tab_name)
+                if entry is None: return None
+                entry["checked_at"] = self.clock()
+                return entry["rows"]
+        with self.lock:
+            current = self.entries.get(tab_name)
+            # 그사이 쓰기가 더 새 내용을 올렸으면 방금 읽은 것 대신 그쪽을 씁니다
+            if current is not entry or (current is not None and current["modified"] != known): return current["rows"] if current else None
+            if data is not None: entry = self._store(tab_name, records_to_rows(data), modified)
+            entry["checked_at"] = self.clock()
+            return entry["rows"]
+
+    def version(self, tab_name):
+        with self.lock:
+            entry = self.entries.get(tab_name)
+            return entry["version"] if entry else 0
+
+    # 시트 쓰기 코드가 스냅샷 dict처럼 쓸 수 있도록 get / [] 를 제공합니다
+    def get(self, tab_name, default=None):
+        with self.lock:
+            entry = self.entries.get(tab_name)
+            return entry["rows"] if entry else default
+
+    def __setitem__(self, tab_name, rows):
+        with self.lock:
+            old = self.entries.get(tab_name)
+            self._store(tab_name, rows, old["modified"] if old else None)
+
+    def mark_synced(self, tab_name, ok=True):
+        # 우리가 방금 쓴 결과가 원격 최신본이므로 수정 시각만 새로 받아 기준으로 삼습니다
+        with self.lock:
+            if tab_name not in self.entries: return
+            previous = self.remote_revision
+        try:
+            if not ok: raise RuntimeError("쓰기 실패")
+            modified = self.connection.revision()
+        except Exception:
+            modified = None
+        with self.lock:
+            entry = self.entries.get(tab_name)
+            if entry is None: return
+            # 실패하면 수정 시각을 비워서 다음 read가 시트를 다시 확인하게 합니다
+            entry["modified"] = modified
+            entry["checked_at"] = None if modified is None else self.clock()
+            if modified is not None:
+                self.remote_revision, self.revision_checked_at = modified, self.clock()
+                # 수정 시각은 스프레드시트 전체 값이라, 쓰기 전 기준과 같던 다른 탭도 함께 옮겨야 다시 읽지 않습니다
+                for other_name, other in self.entries.items():
+                    if other is not entry and previous is not None and other["modified"] == previous:
+                        other["modified"] = modified
+                        self._save_disk(other_name, other)
+            self._save_disk(tab_name, entry)
+
+# --- 변경분 계산 (바뀐/추가된/삭제된 행만 batchUpdate 요청으로) ---
+def to_cell_data(value):
+    if value == "" or value is None: return {}
+    if isinstance(value, bool): return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)): return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+def build_row_diff_requests(sheet_id, old_rows, new_rows):
+    width = max([len(r) for r in old_rows + new_rows] or [0])
+    as_key = lambda row: tuple(str(v) for v in row) + ("",) * (width - len(row))
+
+    def update_cells(start, rows):
+        return {"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": start, "columnIndex": 0},
+            "rows": [{"values": [to_cell_data(v) for v in list(r) + [""] * (width - len(r))]} for r in rows],
+            "fields": "userEnteredValue"}}
+
+    def row_range(start, end):
+        return {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": start, "endIndex": end}
+
+    matcher = difflib.SequenceMatcher(None, [as_key(r) for r in old_rows], [as_key(r) for r in new_rows], autojunk=False)
+    requests = []
+    # 아래쪽 변경부터 보내야 위쪽 행 번호가 밀리지 않습니다
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal": continue
+        overlap = min(i2 - i1, j2 - j1)
+        if overlap: requests.append(update_cells(i1, new_rows[j1:j1 + overlap]))
+        if i2 - i1 > overlap:
+            requests.append({"deleteDimension": {"range": row_range(i1 + overlap, i2)}})
+        if j2 - j1 > overlap:
+            at = i1 + overlap
+            requests.append({"insertDimension": {"range": row_range(at, at + j2 - j1 - overlap), "inheritFromBefore": at > 0}})
+            requests.append(update_cells(at, new_rows[j1 + overlap:j2]))
+    return requests
+
+# --- 시트 쓰기 (시트를 비우지 않고 변경분만 반영) ---
+def api_status(error):
+    # gspread APIError의 HTTP 상태 코드 (그 밖의 예외는 None)
+    code = getattr(error, "code", None)
+    if code is None: code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+def write_sheet_rows(sheet, old_rows, new_rows):
+    from gspread.utils import rowcol_to_a1
+    if old_rows is not None:
+        try:
+            requests = build_row_diff_requests(sheet.id, old_rows, new_rows)
+            if requests: sheet.spreadsheet.batch_update({"requests": requests})
+            return
+        except Exception as e:
+            # 쿼터(429)·서버 오류(5xx)·네트워크 오류는 그대로 올려서 SheetWriter가 쉬었다가 다시 시도하게 합니다
+            if api_status(e) != 400: raise
+    # 스냅샷이 없거나 시트 구조가 달라졌으면(400) 전체를 덮어쓰고 남는 영역만 지웁니다
+    sheet.update(new_rows)
+    width = max(len(r) for r in new_rows)
+    stale = []
+    if len(new_rows) < sheet.row_count:
+        stale.append(f"{rowcol_to_a1(len(new_rows) + 1, 1)}:{rowcol_to_a1(sheet.row_count, sheet.col_count)}")
+    if width < sheet.col_count:
+        stale.append(f"{rowcol_to_a1(1, width + 1)}:{rowcol_to_a1(len(new_rows), sheet.col_count)}")
+    if stale: sheet.batch_clear(stale)
+
+def rows_already_appended(current, before, appends):
+    # 다시 읽은 시트 끝에 이번 행들이 이미 있으면 앞선 시도가 실제로는 반영된 것입니다
+    if not current or len(current) - 1 < len(appends): return False
+    if before is not None and len(current) != len(before) + len(appends): return False
+    width = len(current[0])
+    as_key = lambda row: [str(v) for v in list(row)[:width]] + [""] * (width - len(row))
+    return [as_key(r) for r in current[-len(appends):]] == [as_key(r) for r in appends]
+
+# --- 쓰기 속도 제한 (분당 쿼터를 넘지 않도록 토큰 버킷으로 간격 조절) ---
+class TokenBucket:
+    def __init__(self, rate_per_minute=60, capacity=10, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.sleep((1 - self.tokens) / self.rate)
+
+# --- 백그라운드 시트 쓰기 큐 (탭별로 모아서 합치고, 실패하면 지수 백오프로 재시도) ---
+class SheetWriter:
+    MAX_RETRIES = 5
+
+    def __init__(self, connection, snapshots, on_applied=None, bucket=None, sleep=time.sleep):
+        self.connection = connection
+        self.snapshots = snapshots
+        self.on_applied = on_applied
+        self.bucket = bucket or TokenBucket()
+        self.sleep = sleep
+        self.cond = threading.Condition()
+        # 탭별 대기 작업: 최신 전체 프레임 하나 + 그 뒤에 붙일 행들
+        self.pending = {}
+        self.inflight = {}
+        self.errors = []
+        self.thread = None
+        self.generations = {}  # 탭별 쓰기 요청 횟수 (공용 색인의 버전 키에 씁니다)
+
+    def generation(self, tab_name):
+        with self.cond:
+            return self.generations.get(tab_name, 0)
+
+    def save(self, rows, tab_name):
+        # 실제 쓰기(sheets.write)는 백그라운드 스레드라 실행별 집계에는 요청 수만 잡습니다
+        tracer.count("sheets.write.queued")
+        with self.cond:
+            self.generations[tab_name] = self.generations.get(tab_name, 0) + 1
+            # 같은 탭의 이전 저장/추가는 새 프레임에 이미 반영돼 있으니 하나로 합칩니다
+            self.pending[tab_name] = {"frame": rows, "appends": []}
+            self._wake()
+
+    def append(self, row, tab_name):
+        tracer.count("sheets.write.queued")
+        with self.cond:
+            self.generations[tab_name] = self.generations.get(tab_name, 0) + 1
+            self.pending.setdefault(tab_name, {"frame": None, "appends": []})["appends"].append(list(row))
+            self._wake()
+
+    def _wake(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+            self.thread.start()
+        self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending: self.cond.wait()
+                tab_name = next(iter(self.pending))
+                ops = self.inflight[tab_name] = self.pending.pop(tab_name)
+            ok = True
+            try:
+                # 시트에 반영되는 순간 스냅샷 갱신과 대기 목록 제거를 함께 해야 화면에 두 번 보이지 않습니다
+                if ops["frame"] is not None:
+                    self._call(tab_name, lambda sheet, current: write_sheet_rows(
+                        sheet, self.snapshots.get(tab_name) if current is None else current or None, ops["frame"]))
+                    with self.cond:
+                        self.snapshots[tab_name] = ops["frame"]
+                        ops["frame"] = None
+                if ops["appends"]:
+                    rows = self._call(tab_name, lambda sheet, current: self._append(tab_name, sheet, current, ops["appends"]))
+                    with self.cond:
+                        if rows is not None: self.snapshots[tab_name] = rows
+                        ops["appends"] = []
+            except Exception as e:
+                ok = False
+                with self.cond: self.errors.append(f"{tab_name}: {e}")
+            finally:
+                if self.on_applied: self.on_applied(tab_name, ok)
+                with self.cond:
+                    self.inflight.pop(tab_name, None)
+                    self.cond.notify_all()
+
+    def _append(self, tab_name, sheet, current, appends):
+        # 붙인 뒤의 시트 내용(모르면 None)을 돌려줍니다
+        before = self.snapshots.get(tab_name)
+        if current is not None and rows_already_appended(current, before, appends): return current
+        sheet.append_rows(appends)
+        base = before if current is None else current or None
+        return None if base is None else base + appends
+
+    def _call(self, tab_name, action):
+        # action(sheet, current): current는 애매한 실패 뒤 다시 읽은 시트 내용 (처음 시도면 None)
+        delay = 1.0
+        current, reread = None, False
+        for attempt in range(self.MAX_RETRIES):
+            self.bucket.acquire()
+            tracer.count("sheets.write")
+            try:
+                sheet = self.connection.worksheet(tab_name)
+                if reread:
+                    tracer.count("sheets.get_all_records")
+                    current, reread = records_to_rows(sheet.get_all_records()) or [], False
+                return action(sheet, current)
+            except Exception as e:
+                self.connection.invalidate(tab_name)
+                if attempt == self.MAX_RETRIES - 1: raise
+                # 4xx(429 포함)는 거절된 요청이라 시트가 그대로지만, 5xx·네트워크 오류는 반영됐을 수도 있어서
+                # 다음 시도 전에 시트를 다시 읽고 그 내용을 기준으로 변경분을 다시 계산합니다
+                status = api_status(e)
+                if status is None or status >= 500: reread = True
+                self.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, 32.0)
+
+    def flush(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.inflight, timeout)
+
+    def overlay(self, tab_name, columns):
+        # 아직 시트에 안 들어간 쓰기를 마지막 스냅샷 위에 덮어서 바로 화면에 보이게 합니다
+        import pandas as pd
+        with self.cond:
+            df = rows_to_frame(self.snapshots.get(tab_name), columns)
+            layers = [dict(ops) for ops in (self.inflight.get(tab_name), self.pending.get(tab_name)) if ops]
+        for ops in layers:
+            if ops["frame"] is not None:
+                df = pd.DataFrame(ops["frame"][1:], columns=ops["frame"][0]).reindex(columns=columns, fill_value="")
+            if ops["appends"]:
+                added = pd.DataFrame([r[:len(columns)] + [""] * (len(columns) - len(r)) for r in ops["appends"]], columns=columns)
+                df = added if df.empty else pd.concat([df, added], ignore_index=True)
+        return df
+
+    def take_errors(self):
+        with self.cond:
+            errors, self.errors = self.errors, []
+        return errors
+
+# --- 로컬 SQLite 저장소 (시트 대신 쓰는 내장 DB, 시트는 선택적 동기화 대상) ---
+class SqliteStore:
+    TABLES = {
+        PANTRY_TAB: PANTRY_COLUMNS,
+        RECIPE_TAB: RECIPE_COLUMNS,
+    }
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.ignorable = AhoCorasick(IGNORABLE_INGREDIENTS)
+        self.revisions = {}
+        self._ranking = None
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pantry (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    "재료명" TEXT NOT NULL DEFAULT '', "유통기한" TEXT NOT NULL DEFAULT '', "보관장소" TEXT NOT NULL DEFAULT '');
+                CREATE INDEX IF NOT EXISTS idx_pantry_name ON pantry("재료명");
+                CREATE TABLE IF NOT EXISTS recipes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    "요리명" TEXT NOT NULL DEFAULT '', "필수재료" TEXT NOT NULL DEFAULT '', "링크" TEXT NOT NULL DEFAULT '', "조리법" TEXT NOT NULL DEFAULT '');
+                CREATE INDEX IF NOT EXISTS idx_recipes_name ON recipes("요리명");
+                CREATE TABLE IF NOT EXISTS recipe_ingredient (
+                    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    raw TEXT NOT NULL,
+                    ingredient TEXT NOT NULL,
+                    ignorable INTEGER NOT NULL,
+                    PRIMARY KEY (recipe_id, position));
+                CREATE INDEX IF NOT EXISTS idx_recipe_ingredient ON recipe_ingredient(ingredient);
+            """)
+            # 예전 DB에는 전처리 열이 없으므로 붙여 줍니다 (빈 값은 읽을 때 다시 계산)
+            existing = {row[1] for row in self.conn.execute("PRAGMA table_info(recipes)")}
+            for col in PARSED_COLUMNS:
+                if col not in existing: self.conn.execute(f'ALTER TABLE recipes ADD COLUMN "{col}" TEXT NOT NULL DEFAULT \'\'')
+
+    def revision(self, tab_name):
+        # 이 프로세스의 쓰기 횟수 + 다른 연결(다른 프로세스)이 커밋하면 바뀌는 data_version
+        with self.lock:
+            return self.revisions.get(tab_name, 0), self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _touch(self, tab_name):
+        self.revisions[tab_name] = self.revisions.get(tab_name, 0) + 1
+
+    def is_empty(self):
+        with self.lock:
+            return not any(self.conn.execute(f"SELECT 1 FROM {t} LIMIT 1").fetchone() for t in self.TABLES)
+
+    def _columns_sql(self, tab_name):
+        return ", ".join(f'"{c}"' for c in self.TABLES[tab_name])
+
+    def _index_ingredients(self, recipe_id, recipe):
+        self.conn.execute("DELETE FROM recipe_ingredient WHERE recipe_id = ?", (recipe_id,))
+        rows = []
+        raw_ingredients = [x.strip() for x in str(recipe["필수재료"]).split(",")]
+        for pos, (raw, cleaned) in enumerate(zip(raw_ingredients, recipe_tokens(recipe))):
+            rows.append((recipe_id, pos, raw, cleaned, int(self.ignorable.contains_any(cleaned))))
+        self.conn.executemany("INSERT INTO recipe_ingredient VALUES (?, ?, ?, ?, ?)", rows)
+
+    def _with_parsed(self, tab_name, values):
+        # 레시피는 전처리 열이 비었거나 원문과 안 맞으면 저장하기 전에 채웁니다
+        if tab_name != RECIPE_TAB: return list(values), None
+        values = complete_recipe_row(values)
+        return values, dict(zip(RECIPE_COLUMNS, values))
+
+    def _insert(self, tab_name, values):
+        values, recipe = self._with_parsed(tab_name, values)
+        cur = self.conn.execute(f"INSERT INTO {tab_name} ({self._columns_sql(tab_name)}) VALUES ({', '.join('?' * len(values))})", values)
+        if recipe is not None: self._index_ingredients(cur.lastrowid, recipe)
+
+    def _update(self, tab_name, row_id, values):
+        values, recipe = self._with_parsed(tab_name, values)
+        assignments = ", ".join(f'"{c}" = ?' for c in self.TABLES[tab_name])
+        self.conn.execute(f"UPDATE {tab_name} SET {assignments} WHERE id = ?", list(values) + [row_id])
+        if recipe is not None: self._index_ingredients(row_id, recipe)
+
+    def load(self, tab_name, columns):
+        import pandas as pd
+        with self.lock:
+            df = pd.read_sql_query(f"SELECT {self._columns_sql(tab_name)} FROM {tab_name} ORDER BY id", self.conn)
+        for col in columns:
+            if col not in df.columns: df[col] = ""
+        return df[columns]
+
+    def save_rows(self, rows, tab_name):
+        # 시트 저장과 같은 [헤더] + 행 목록을 받아서, 바뀐 행만 UPDATE/DELETE/INSERT 합니다
+        schema = self.TABLES[tab_name]
+        header = list(rows[0]) if rows else schema
+        new_values = [tuple("" if c not in header else str(r[header.index(c)]) for c in schema) for r in rows[1:]]
+        new_values = [tuple(self._with_parsed(tab_name, v)[0]) for v in new_values]
+        with self.lock, self.conn:
+            self._touch(tab_name)
+            current = self.conn.execute(f"SELECT id, {self._columns_sql(tab_name)} FROM {tab_name} ORDER BY id").fetchall()
+            ids = [r[0] for r in current]
+            matcher = difflib.SequenceMatcher(None, [tuple(r[1:]) for r in current], new_values, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal": continue
+                overlap = min(i2 - i1, j2 - j1)
+                for k in range(overlap): self._update(tab_name, ids[i1 + k], new_values[j1 + k])
+                if i2 - i1 > overlap:
+                    self.conn.executemany(f"DELETE FROM {tab_name} WHERE id = ?", [(i,) for i in ids[i1 + overlap:i2]])
+                for values in new_values[j1 + overlap:j2]: self._insert(tab_name, values)
+
+    def append(self, row, tab_name):
+        values = [str(v) for v in row][:len(self.TABLES[tab_name])]
+        values += [""] * (len(self.TABLES[tab_name]) - len(values))
+        with self.lock, self.conn:
+            self._touch(tab_name)
+            self._insert(tab_name, values)
+
+    def dedupe_recipes(self):
+        with self.lock, self.conn:
+            self._touch(RECIPE_TAB)
+            return self.conn.execute(
+                'DELETE FROM recipes WHERE id NOT IN (SELECT MIN(id) FROM recipes GROUP BY "요리명", "링크")').rowcount
+
+    def _ranking_state(self):
+        # 재료 이름 목록(부분 문자열 매칭용)과 레시피별 무시 재료 점수는 레시피가 바뀔 때만 다시 읽습니다
+        revision = self.revision(RECIPE_TAB)
+        if self._ranking is None or self._ranking[0] != revision:
+            names = [r[0] for r in self.conn.execute("SELECT DISTINCT ingredient FROM recipe_ingredient WHERE NOT ignorable")]
+            recipes = self.conn.execute("""
+                SELECT r.id, r."요리명", COALESCE(SUM(ri.ignorable), 0) FROM recipes r
+                LEFT JOIN recipe_ingredient ri ON ri.recipe_id = r.id GROUP BY r.id ORDER BY r.id
+            """).fetchall()
+            base = {recipe_id: (name, score) for recipe_id, name, score in recipes}
+            base_order = [r[0] for r in sorted(recipes, key=lambda r: -r[2])]
+            self._ranking = (revision, names, char_postings(names), base, base_order)
+        return self._ranking
+
+    def top_k(self, pantry_set, k=1, excluded=()):
+        # RecipeIndex.top_k와 같은 규칙(무시 재료 + 부분 문자열 매칭 + 돼지고기 대체)을 SQL로
+        # 냉장고 재료에 닿는 재료 이름을 먼저 고른 뒤 색인(idx_recipe_ingredient)으로 그 레시피만 채점합니다
+        patterns = set(pantry_set)
+        if "돼지고기" in pantry_set: patterns |= PORK_EQUIVALENTS
+        excluded = set(excluded)
+        with self.lock:
+            _, names, chars, base, base_order = self._ranking_state()
+            matched = sorted({t for p in patterns for t in tokens_containing(chars, names, p)})
+            hits = self.conn.execute("""
+                SELECT recipe_id, COUNT(*) FROM recipe_ingredient
+                WHERE ingredient IN (SELECT value FROM json_each(?)) AND NOT ignorable GROUP BY recipe_id
+            """, (json.dumps(matched),)).fetchall()
+            candidates = [(-(base[i][1] + n), i) for i, n in hits if base[i][0] not in excluded]
+            # 닿지 않은 레시피는 기본 점수 순서대로 앞에서 k개만 후보로 둡니다
+            reached, rest = dict(hits), 0
+            for i in base_order:
+                if rest >= k: break
+                if i in reached or base[i][0] in excluded: continue
+                candidates.append((-base[i][1], i))
+                rest += 1
+            best = heapq.nsmallest(k, candidates)
+            rows = dict((r[0], r[1:]) for r in self.conn.execute(
+                f"SELECT id, {self._columns_sql(RECIPE_TAB)} FROM recipes WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([i for _, i in best]),)))
+        return [(dict(zip(RECIPE_COLUMNS, rows[i])), -neg) for neg, i in best]
+
+    def import_csv(self, recipes_path, pantry_path):
+        import pandas as pd
+        for tab_name, path in ((RECIPE_TAB, recipes_path), (PANTRY_TAB, pantry_path)):
+            if not os.path.exists(path): continue
+            df = pd.read_csv(path, dtype=str).fillna("")
+            for col in self.TABLES[tab_name]:
+                if col not in df.columns: df[col] = ""
+            with self.lock, self.conn:
+                self._touch(tab_name)
+                for values in df[self.TABLES[tab_name]].itertuples(index=False):
+                    self._insert(tab_name, list(values))
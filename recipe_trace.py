@@ -0,0 +1,137 @@
+# 가벼운 추적 도구: 구간별 시간(span)과 호출 횟수(counter)를 화면 실행(rerun) 단위로 모읍니다
+# 켜기: RECIPE_TRACE=1 (꺼져 있으면 span/count는 아무것도 하지 않는 빈 호출)
+# 기록 파일: RECIPE_TRACE_FILE=trace.jsonl 이면 실행마다 한 줄씩 추가
+# 모아 보기: python recipe_trace.py trace.jsonl
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Run:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = {}  # 이름 -> [횟수, 누적 초]
+        self.counters = Counter()
+
+    def to_record(self, status):
+        return {
+            "label": self.label,
+            "started_at": round(self.started_at, 3),
+            "status": status,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "spans": {name: {"count": c, "ms": round(s * 1000, 3)} for name, (c, s) in self.spans.items()},
+            "counters": dict(self.counters),
+        }
+
+class Tracer:
+    def __init__(self, enabled=False, export_path=None, history=50):
+        self.enabled = enabled
+        self.export_path = export_path
+        # 실행(run)은 컨텍스트 변수에 둡니다. asyncio 작업은 제출한 쪽의 컨텍스트를 물려받으므로
+        # Gemini 호출처럼 이벤트 루프 스레드에서 도는 일도 그 호출을 보낸 실행에 잡힙니다
+        self.current = contextvars.ContextVar("recipe_trace_run", default=None)
+        self.lock = threading.Lock()
+        # 백그라운드 스레드(시트 쓰기 등) 호출까지 포함한 프로세스 전체 누적 횟수
+        self.totals = Counter()
+        self.recent = deque(maxlen=history)
+
+    def span(self, name):
+        if not self.enabled: return NULL_SPAN
+        return Span(self, name)
+
+    def count(self, name, n=1):
+        if not self.enabled: return
+        run = self.current.get()
+        with self.lock:
+            self.totals[name] += n
+            if run is not None: run.counters[name] += n
+
+    def _record(self, name, seconds):
+        run = self.current.get()
+        if run is None: return
+        with self.lock:
+            entry = run.spans.get(name)
+            if entry is None: run.spans[name] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def begin_run(self, label=""):
+        if not self.enabled: return None
+        run = Run(label)
+        self.current.set(run)
+        return run
+
+    def end_run(self, run, status="ok"):
+        if run is None: return None
+        if self.current.get() is run: self.current.set(None)
+        with self.lock:
+            record = run.to_record(status)
+            self.recent.append(record)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+tracer = Tracer(enabled=os.environ.get("RECIPE_TRACE") == "1", export_path=os.environ.get("RECIPE_TRACE_FILE") or None)
+
+# --- 기록 파일 집계 (구간별 p50/p99, 카운터 합계) ---
+def summarize(records):
+    spans, counters, totals = {}, Counter(), []
+    for record in records:
+        totals.append(record["total_ms"])
+        counters.update(record["counters"])
+        for name, s in record["spans"].items():
+            spans.setdefault(name, []).append(s["ms"])
+
+    def pct(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    rows = [("(rerun)", len(totals), pct(totals, 0.5), pct(totals, 0.99), sum(totals))] if totals else []
+    rows += sorted(((name, len(v), pct(v, 0.5), pct(v, 0.99), sum(v)) for name, v in spans.items()), key=lambda r: -r[4])
+    return rows, counters
+
+def main(paths):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    rows, counters = summarize(records)
+    print(f"{'span':<28}{'runs':>8}{'p50 ms':>10}{'p99 ms':>10}{'total ms':>12}")
+    for name, n, p50, p99, total in rows:
+        print(f"{name:<28}{n:>8}{p50:>10.1f}{p99:>10.1f}{total:>12.1f}")
+    if counters:
+        print()
+        for name, n in sorted(counters.items()):
+            print(f"{name:<28}{n:>8}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
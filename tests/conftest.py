@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 모듈(recipe_engine 등)을 그대로 import 할 수 있게 합니다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,165 @@
+# 추천 멘트 캐시/미리 생성 동작 확인 (Gemini 대신 주입한 generate 사용)
+import asyncio
+import threading
+
+import pytest
+
+from recipe_ai import BlurbService, JsonDiskCache, get_ai_recommendations
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubClient:
+    # AsyncGeminiClient처럼 전용 스레드의 이벤트 루프에서 코루틴을 돌립니다
+    timeout = 5
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+class StubGenerate:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    async def __call__(self, client, model_name, recipe_name, missing_items):
+        self.calls.append(recipe_name)
+        while not self.release.is_set():
+            await asyncio.sleep(0.001)
+        return {"recommendations": [{"name": recipe_name, "reason": f"{recipe_name} 좋아요", "missing": ""}]}
+
+
+@pytest.fixture
+def client():
+    client = StubClient()
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def generate():
+    return StubGenerate()
+
+
+def test_cache_hit_skips_generate(client, generate):
+    service = BlurbService(JsonDiskCache(":memory:"), client, generate=generate)
+    first = service.request("m", "김치찌개", ["두부"]).result(5)
+    second = service.request("m", "김치찌개", ["두부"])
+    assert second.done()
+    assert second.result() == first
+    assert generate.calls == ["김치찌개"]
+
+
+def test_missing_items_order_does_not_change_key(client, generate):
+    service = BlurbService(JsonDiskCache(":memory:"), client, generate=generate)
+    service.request("m", "제육볶음", ["양파", "돼지고기"]).result(5)
+    service.request("m", "제육볶음", ["돼지고기", "양파"]).result(5)
+    assert generate.calls == ["제육볶음"]
+
+
+def test_prefetch_is_reused_by_request(client, generate):
+    service = BlurbService(JsonDiskCache(":memory:"), client, generate=generate)
+    generate.release.clear()
+    service.prefetch("m", "라면", [])
+    service.prefetch("m", "라면", [])  # 이미 만드는 중이면 다시 부르지 않습니다
+    future = service.request("m", "라면", [])
+    assert not future.done()
+    generate.release.set()
+    assert future.result(5)["recommendations"][0]["name"] == "라면"
+    assert generate.calls == ["라면"]
+    # 끝난 결과는 캐시에 남아서 다음 요청은 바로 끝납니다
+    assert service.request("m", "라면", []).done()
+    assert generate.calls == ["라면"]
+
+
+def test_prefetch_skips_cached(client, generate):
+    cache = JsonDiskCache(":memory:")
+    service = BlurbService(cache, client, generate=generate)
+    service.request("m", "된장찌개", []).result(5)
+    service.prefetch("m", "된장찌개", [])
+    assert generate.calls == ["된장찌개"]
+
+
+def test_ttl_expiry(tmp_path):
+    clock = Clock()
+    cache = JsonDiskCache(str(tmp_path / "blurbs.sqlite"), ttl=60, clock=clock)
+    cache.put("k", {"v": 1})
+    clock.now += 60
+    assert cache.get("k") == {"v": 1}
+    assert cache.contains("k")
+    clock.now += 1
+    assert not cache.contains("k")
+    assert cache.get("k") is None
+
+
+def test_expired_entry_is_regenerated(client, generate):
+    clock = Clock()
+    service = BlurbService(JsonDiskCache(":memory:", ttl=60, clock=clock), client, generate=generate)
+    service.request("m", "카레", []).result(5)
+    clock.now += 61
+    service.request("m", "카레", []).result(5)
+    assert generate.calls == ["카레", "카레"]
+
+
+def test_lru_eviction(tmp_path):
+    clock = Clock()
+    cache = JsonDiskCache(str(tmp_path / "blurbs.sqlite"), max_entries=2, clock=clock)
+    cache.put("a", 1)
+    clock.now += 1
+    cache.put("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1  # a를 최근에 썼으므로 b가 가장 오래 안 쓴 항목
+    clock.now += 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_disk_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "blurbs.sqlite")
+    JsonDiskCache(path).put("k", {"한글": "값"})
+    assert JsonDiskCache(path).get("k") == {"한글": "값"}
+
+
+def test_same_name_picks_share_one_blurb(client, generate):
+    # 이름이 같은 레시피(링크만 다름)는 진행 중인 요청 하나를 나눠 쓰고, 둘 다 멘트를 받아야 합니다
+    service = BlurbService(JsonDiskCache(":memory:"), client, generate=generate)
+    recipes = [
+        {"요리명": "김치찌개", "필수재료": "김치, 두부", "링크": "https://a", "조리법": ""},
+        {"요리명": "김치찌개", "필수재료": "김치, 두부", "링크": "https://b", "조리법": ""},
+    ]
+    generate.release.clear()
+    futures = []
+    request = service.request
+
+    def request_then_release(*args):
+        # 두 자리가 모두 요청을 보낸 뒤에야 생성을 끝냅니다 (둘이 같은 진행 중 Future를 받도록)
+        futures.append(request(*args))
+        if len(futures) == len(recipes): generate.release.set()
+        return futures[-1]
+
+    service.request = request_then_release
+    result = get_ai_recommendations("key", ["김치", "두부"], recipes, [], blurbs=service, k=2)
+    assert futures[0] is futures[1]
+    recs = result["recommendations"]
+    assert [r["reason"] for r in recs] == ["김치찌개 좋아요"] * 2
+    assert all("fallback" not in r for r in recs)
+    assert generate.calls == ["김치찌개"]
@@ -0,0 +1,90 @@
+# IngredientMatcher / score_recipe가 기준 구현(check_is_present)과 같은 답을 내는지 확인
+import random
+
+import pytest
+
+import recipe_engine
+from recipe_engine import (
+    IGNORABLE_INGREDIENTS, PORK_EQUIVALENTS, IngredientMatcher, check_is_present, normalize_pantry, score_recipe, shared_matcher,
+)
+
+MAINS = ["김치", "두부", "계란", "스팸", "참치캔", "애호박", "감자", "버섯", "콩나물", "떡", "라면", "밥", "치즈", "우유"]
+AMOUNTS = ["", " 100g", " 2개", " 1/2컵", " 한 줌", " 약간", "(잘게 썬 것) 1큰술", " 3스푼"]
+VOCAB = MAINS + sorted(PORK_EQUIVALENTS) + sorted(IGNORABLE_INGREDIENTS) + ["", "김", "파프리카", "돼지"]
+
+
+def random_ingredient(rng):
+    return rng.choice(VOCAB) + rng.choice(AMOUNTS)
+
+
+def random_pantry(rng):
+    return normalize_pantry(rng.sample(MAINS + sorted(PORK_EQUIVALENTS) + ["", "파"], rng.randint(0, 8)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_is_present_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        pantry = random_pantry(rng)
+        matcher = IngredientMatcher(pantry)
+        for _ in range(30):
+            ingredient = random_ingredient(rng)
+            assert matcher.is_present(ingredient) == check_is_present(ingredient, pantry), (ingredient, pantry)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_score_recipe_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        pantry = random_pantry(rng)
+        recipe = {"필수재료": ",".join(random_ingredient(rng) for _ in range(rng.randint(1, 8)))}
+        expected = sum(check_is_present(x, pantry) for x in recipe["필수재료"].split(","))
+        assert score_recipe(pantry, recipe) == expected
+        assert score_recipe(pantry, recipe, IngredientMatcher(pantry)) == expected
+
+
+def test_score_recipe_reuses_matcher_per_pantry(monkeypatch):
+    # 매칭기를 안 넘기면 같은 냉장고는 자동기를 한 번만 만들고, 냉장고가 바뀌면 새로 만듭니다
+    built = []
+
+    class CountingMatcher(IngredientMatcher):
+        def __init__(self, pantry_set):
+            built.append(pantry_set)
+            super().__init__(pantry_set)
+
+    monkeypatch.setattr(recipe_engine, "IngredientMatcher", CountingMatcher)
+    shared_matcher.cache_clear()
+    pantry = {"김치", "두부"}
+    recipes = [{"필수재료": f"김치 {i}개, 두부, 파프리카"} for i in range(20)]
+    assert [score_recipe(pantry, r) for r in recipes] == [3] * 20
+    pantry.discard("두부")
+    assert score_recipe(pantry, recipes[0]) == 2
+    assert built == [frozenset({"김치", "두부"}), frozenset({"김치"})]
+    shared_matcher.cache_clear()
+
+
+def test_empty_pantry_entry_matches_everything():
+    # 빈 문자열은 어떤 문자열에도 들어 있으므로 기준 구현에서도 항상 '있음'
+    pantry = {""}
+    for ingredient in ["김치 100g", "", "파프리카", "(선택)"]:
+        assert IngredientMatcher(pantry).is_present(ingredient) == check_is_present(ingredient, pantry) is True
+
+
+def test_empty_ingredient_without_empty_pantry_entry():
+    pantry = {"김치"}
+    assert IngredientMatcher(pantry).is_present("") == check_is_present("", pantry) is False
+
+
+@pytest.mark.parametrize("meat", sorted(PORK_EQUIVALENTS))
+def test_pork_substitution(meat):
+    # 냉장고에 돼지고기 부위가 하나라도 있으면 다른 부위를 쓰는 레시피도 재료가 있는 것으로 봅니다
+    pantry = normalize_pantry([meat])
+    assert "돼지고기" in pantry
+    matcher = IngredientMatcher(pantry)
+    for other in sorted(PORK_EQUIVALENTS):
+        assert matcher.is_present(f"{other} 300g") == check_is_present(f"{other} 300g", pantry) is True
+
+
+def test_no_pork_substitution_without_pork():
+    pantry = normalize_pantry(["김치"])
+    assert IngredientMatcher(pantry).is_present("삼겹살 200g") == check_is_present("삼겹살 200g", pantry) is False
@@ -0,0 +1,116 @@
+# 추천 순위 계산기들이 '모든 레시피를 score_recipe로 채점한 뒤 정렬'한 결과와 같은지 확인
+import random
+
+import pytest
+
+from recipe_engine import PORK_EQUIVALENTS, PantryScoreCache, RecipeIndex, RecipeMatrix, normalize_pantry, score_recipe
+
+MAINS = ["김치", "두부", "계란", "스팸", "참치캔", "감자", "버섯", "떡", "라면", "밥"] + sorted(PORK_EQUIVALENTS)
+SEASONINGS = ["대파", "양파", "간장", "고추장", "설탕", "소금"]
+AMOUNTS = ["", " 100g", " 2개", "(잘게 썬 것) 1큰술", " 약간"]
+
+
+def random_book(rng, n, names=40):
+    # 이름 종류를 적게 두어 같은 이름(제외 목록)과 동점이 자주 나오게 합니다
+    book = []
+    for _ in range(n):
+        items = rng.sample(MAINS, rng.randint(0, 3)) + rng.sample(SEASONINGS, rng.randint(0, 3))
+        name = f"{items[0] if items else '빈'}요리 {rng.randrange(names)}"
+        book.append({"요리명": name, "필수재료": ", ".join(x + rng.choice(AMOUNTS) for x in items), "조리법": ""})
+    return book
+
+
+def random_pantry(rng):
+    return rng.sample(MAINS + ["파", "없는재료"], rng.randint(0, 6))
+
+
+def reference_top_k(book, pantry_list, k, excluded=()):
+    pantry_set = normalize_pantry(pantry_list)
+    scored = [(-score_recipe(pantry_set, r), idx) for idx, r in enumerate(book) if r["요리명"] not in set(excluded)]
+    return [(idx, -neg) for neg, idx in sorted(scored)[:k]]
+
+
+def positions(book, ranked):
+    # 같은 dict 객체인지로 원래 자리를 찾습니다 (이름이 같은 레시피 구분)
+    where = {id(r): idx for idx, r in enumerate(book)}
+    return [(where[id(r)], score) for r, score in ranked]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_recipe_index_top_k_matches_reference(seed):
+    rng = random.Random(seed)
+    book = random_book(rng, 300)
+    index = RecipeIndex(book)
+    for _ in range(60):
+        pantry = random_pantry(rng)
+        excluded = rng.sample(index.names, rng.randint(0, 4))
+        k = rng.choice([1, 3, 10, 400])
+        assert positions(book, index.top_k(normalize_pantry(pantry), k=k, excluded=excluded)) == reference_top_k(book, pantry, k, excluded)
+
+
+def test_recipe_index_zero_score_fallback():
+    # 냉장고 재료가 어디에도 안 닿으면 무시 재료(양념) 점수 순, 동점이면 원래 순서
+    book = [
+        {"요리명": "a", "필수재료": "김치", "조리법": ""},
+        {"요리명": "b", "필수재료": "대파, 간장", "조리법": ""},
+        {"요리명": "c", "필수재료": "두부, 소금", "조리법": ""},
+        {"요리명": "d", "필수재료": "스팸, 양파", "조리법": ""},
+    ]
+    index = RecipeIndex(book)
+    assert [(r["요리명"], s) for r, s in index.top_k({"없는재료"}, k=3)] == [("b", 2), ("c", 1), ("d", 1)]
+    assert [(r["요리명"], s) for r, s in index.top_k(set(), k=2, excluded=["b"])] == [("c", 1), ("d", 1)]
+    # 닿은 레시피가 기본 점수만 가진 레시피를 앞지를 때
+    assert [(r["요리명"], s) for r, s in index.top_k({"김치"}, k=2)] == [("b", 2), ("a", 1)]
+    assert index.top_k({"김치"}, k=5, excluded=["a", "b", "c", "d"]) == []
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_recipe_matrix_matches_reference(seed):
+    rng = random.Random(seed)
+    book = random_book(rng, 300)
+    matrix = RecipeMatrix(RecipeIndex(book))
+    # BATCH를 넘겨서 여러 묶음으로 나뉘는 경우까지
+    pantries = [random_pantry(rng) for _ in range(RecipeMatrix.BATCH * 2 + 5)]
+    pantry_sets = [normalize_pantry(p) for p in pantries]
+    scores = matrix.score_many(pantry_sets)
+    assert scores.shape == (len(book), len(pantries))
+    for j, pantry_set in enumerate(pantry_sets):
+        expected = [score_recipe(pantry_set, r) for r in book]
+        assert scores[:, j].tolist() == expected
+        assert matrix.score(pantry_set).tolist() == expected
+    excluded = rng.sample(sorted(set(r["요리명"] for r in book)), 5)
+    for k in (1, 3, 400):
+        ranked = matrix.top_k_many(pantry_sets, k=k, excluded=excluded)
+        assert [positions(book, r) for r in ranked] == [reference_top_k(book, p, k, excluded) for p in pantries]
+
+
+def test_recipe_matrix_empty_inputs():
+    matrix = RecipeMatrix(RecipeIndex(random_book(random.Random(0), 10)))
+    assert matrix.score_many([]).shape == (10, 0)
+    assert matrix.top_k_many([]) == []
+    # 모든 레시피를 제외하면 빈 목록
+    assert matrix.top_k_many([{"김치"}], k=3, excluded=list(matrix.names)) == [[]]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pantry_score_cache_follows_add_and_remove(seed):
+    rng = random.Random(seed)
+    book = random_book(rng, 300)
+    index = RecipeIndex(book)
+    pantry = random_pantry(rng)
+    cache = PantryScoreCache(index, pantry)
+    for _ in range(150):
+        # 같은 재료를 두 번 넣거나, 없는 재료를 빼거나, 돼지고기 부위를 넣고 빼는 경우까지 섞습니다
+        if rng.random() < 0.5:
+            item = rng.choice(MAINS + ["파", "없는재료"] + pantry)
+            cache.add(item)
+            pantry.append(item)
+        else:
+            item = rng.choice(pantry) if pantry and rng.random() < 0.8 else rng.choice(MAINS)
+            cache.remove(item)
+            if item in pantry: pantry.remove(item)
+        excluded = rng.sample(index.names, rng.randint(0, 4))
+        k = rng.choice([1, 3, 10])
+        expected = index.top_k(normalize_pantry(pantry), k=k, excluded=excluded)
+        assert positions(book, cache.top_k(k=k, excluded=excluded)) == positions(book, expected)
+        assert cache.scores == [score_recipe(normalize_pantry(pantry), r) for r in book]
@@ -0,0 +1,144 @@
+# 세션 공용 색인(copy-on-write)을 여러 스레드에서 동시에 읽고 갱신해 보는 테스트
+import random
+import threading
+import time
+
+from recipe_engine import SharedRecipeIndex
+
+ROWS = 50
+
+
+class Source:
+    # 원본 레시피북 흉내: version이 바뀌면 내용도 바뀝니다
+    def __init__(self):
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def key(self):
+        return self.version
+
+    def bump(self):
+        with self.lock:
+            self.version += 1
+            return self.version
+
+    def build(self):
+        # 만드는 도중에 다른 스레드가 끼어들 수 있도록 조금씩 쉬면서 채웁니다
+        version = self.version
+        rows = []
+        for _ in range(ROWS):
+            rows.append(version)
+            if random.random() < 0.1: time.sleep(0.0005)
+        return {"version": version, "rows": rows, "complete": True}
+
+
+def check_complete(value):
+    assert value["complete"]
+    assert len(value["rows"]) == ROWS
+    assert set(value["rows"]) == {value["version"]}
+
+
+def run_threads(targets):
+    errors = []
+
+    def guard(fn):
+        def wrapper():
+            try:
+                fn()
+            except BaseException as e:
+                errors.append(e)
+        return wrapper
+
+    threads = [threading.Thread(target=guard(fn)) for fn in targets]
+    for t in threads: t.start()
+    for t in threads: t.join(30)
+    assert not any(t.is_alive() for t in threads)
+    if errors: raise errors[0]
+
+
+def test_readers_never_see_half_built_versions():
+    source, shared = Source(), SharedRecipeIndex()
+    stop = threading.Event()
+    reads = []
+
+    def reader():
+        last = -1
+        count = 0
+        while not stop.is_set():
+            value = shared.get(source.key, source.build)
+            check_complete(value)
+            # 한 세션이 보는 버전은 뒤로 가지 않습니다
+            assert value["version"] >= last
+            last = value["version"]
+            count += 1
+            time.sleep(0)
+        reads.append(count)
+
+    def writer():
+        for _ in range(30):
+            source.bump()
+            time.sleep(0.002)
+        stop.set()
+
+    run_threads([reader] * 8 + [writer])
+    assert sum(reads) > 0
+    # 버전 하나당 많아야 한 번만 만듭니다
+    assert shared.builds <= source.version + 1
+    final = shared.get(source.key, source.build)
+    check_complete(final)
+    assert final["version"] == source.version
+
+
+def test_refresh_returns_the_writers_own_version():
+    source, shared = Source(), SharedRecipeIndex()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            check_complete(shared.get(source.key, source.build))
+            time.sleep(0)
+
+    def writer():
+        for _ in range(20):
+            mine = source.bump()
+            value = shared.refresh(source.key, source.build)
+            check_complete(value)
+            assert value["version"] >= mine
+
+    def writers():
+        run_threads([writer] * 3)
+        stop.set()
+
+    run_threads([reader] * 4 + [writers])
+    assert shared.builds <= source.version + 1
+
+
+def test_cold_start_builds_once():
+    source, shared = Source(), SharedRecipeIndex()
+    results = []
+    run_threads([lambda: results.append(shared.get(source.key, source.build))] * 16)
+    assert shared.builds == 1
+    assert len({id(v) for v in results}) == 1
+    check_complete(results[0])
+
+
+def test_stale_value_is_served_while_another_session_rebuilds():
+    source, shared = Source(), SharedRecipeIndex()
+    first = shared.get(source.key, source.build)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        return source.build()
+
+    source.bump()
+    builder = threading.Thread(target=lambda: shared.get(source.key, slow_build))
+    builder.start()
+    assert started.wait(5)
+    # 다른 세션이 만드는 중에는 기다리지 않고 이전 버전을 그대로 받습니다
+    assert shared.get(source.key, source.build) is first
+    release.set()
+    builder.join(5)
+    assert shared.get(source.key, source.build)["version"] == 1
+    assert shared.builds == 2
@@ -0,0 +1,464 @@
+# 구글 시트 연결·쓰기 확인 (gspread 워크시트 대신 요청을 실제로 적용해 보는 가짜 시트 사용)
+import random
+import threading
+import time
+
+import pytest
+from gspread.utils import a1_range_to_grid_range
+
+from recipe_storage import SheetConnection, SheetWriter, TabCache, build_row_diff_requests, write_sheet_rows
+
+
+class ApiError(Exception):
+    # gspread APIError처럼 HTTP 상태 코드를 code로 들고 있습니다
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeSheet:
+    # 값은 문자열 격자로 들고, batchUpdate 요청(행 삽입/삭제, 셀 갱신)을 순서대로 적용합니다
+    id = 7
+
+    def __init__(self, rows=(), row_count=None, col_count=26):
+        self.row_count = max(row_count or len(rows) + 5, len(rows))
+        self.col_count = col_count
+        self.grid = [[""] * col_count for _ in range(self.row_count)]
+        self._write(0, 0, rows)
+        self.spreadsheet = self
+        self.calls = []
+        self.fail = []  # 쓰기 호출에서 반영하기 전에 차례로 던질 예외
+        self.lost = []  # 반영한 뒤에 던질 예외 (응답만 잃어버린 경우)
+        self.entered = threading.Event()
+        self.gate = threading.Event()  # 비워 두면 쓰기 호출이 여기서 기다립니다 (진행 중인 쓰기 흉내)
+        self.gate.set()
+
+    def _write(self, row, col, rows):
+        for i, values in enumerate(rows):
+            for j, value in enumerate(values):
+                self.grid[row + i][col + j] = str(value)
+
+    def _cell(self, data):
+        value = data.get("userEnteredValue", {})
+        return str(next(iter(value.values()), ""))
+
+    def batch_update(self, body):
+        self.calls.append("batch_update")
+        self._wait()
+        if self.fail: raise self.fail.pop(0)
+        self._apply(body)
+        if self.lost: raise self.lost.pop(0)
+
+    def _wait(self):
+        self.entered.set()
+        assert self.gate.wait(5)
+
+    def _apply(self, body):
+        for request in body["requests"]:
+            (kind, spec), = request.items()
+            assert spec.get("range", spec.get("start"))["sheetId"] == self.id
+            if kind == "deleteDimension":
+                del self.grid[spec["range"]["startIndex"]:spec["range"]["endIndex"]]
+            elif kind == "insertDimension":
+                at = spec["range"]["startIndex"]
+                self.grid[at:at] = [[""] * self.col_count for _ in range(spec["range"]["endIndex"] - at)]
+            elif kind == "updateCells":
+                assert spec["fields"] == "userEnteredValue"
+                start = spec["start"]
+                self._write(start["rowIndex"], start["columnIndex"], [[self._cell(c) for c in r["values"]] for r in spec["rows"]])
+            else:
+                raise AssertionError(kind)
+            self.row_count = len(self.grid)
+
+    def update(self, rows, range_name=None):
+        self.calls.append("update")
+        while len(self.grid) < len(rows): self.grid.append([""] * self.col_count)
+        self.row_count = len(self.grid)
+        self._write(0, 0, rows)
+
+    def batch_clear(self, ranges):
+        self.calls.append("batch_clear")
+        for a1 in ranges:
+            r = a1_range_to_grid_range(a1)
+            for i in range(r["startRowIndex"], r["endRowIndex"]):
+                for j in range(r["startColumnIndex"], r["endColumnIndex"]):
+                    self.grid[i][j] = ""
+
+    def append_rows(self, rows):
+        self.calls.append("append_rows")
+        self._wait()
+        if self.fail: raise self.fail.pop(0)
+        at = len(self.values())
+        while len(self.grid) < at + len(rows): self.grid.append([""] * self.col_count)
+        self.row_count = len(self.grid)
+        self._write(at, 0, rows)
+        if self.lost: raise self.lost.pop(0)
+
+    def values(self):
+        # get_all_values처럼 뒤쪽 빈 행/열을 잘라 냅니다
+        return trimmed(self.grid)
+
+    def get_all_records(self):
+        self.calls.append("get_all_records")
+        values = self.values()
+        return [dict(zip(values[0], row)) for row in values[1:]] if values else []
+
+
+class StubConnection:
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.invalidated = []
+
+    def worksheet(self, tab_name):
+        return self.sheet
+
+    def invalidate(self, tab_name=None):
+        self.invalidated.append(tab_name)
+
+
+class NoLimit:
+    def acquire(self):
+        pass
+
+
+def make_writer(sheet, snapshots, on_applied=None):
+    delays = []
+    writer = SheetWriter(StubConnection(sheet), snapshots, on_applied=on_applied, bucket=NoLimit(), sleep=delays.append)
+    return writer, delays
+
+
+def trimmed(rows):
+    rows = [[str(v) for v in r] for r in rows]
+    while rows and not any(rows[-1]): rows.pop()
+    width = max([j + 1 for r in rows for j, v in enumerate(r) if v] or [0])
+    return [(r + [""] * width)[:width] for r in rows]
+
+
+def random_rows(rng, n, width):
+    return [[f"{rng.choice('가나다라마')}{rng.randrange(6)}" for _ in range(width)] for _ in range(n)]
+
+
+def edited(rng, rows):
+    # 행 삽입/삭제/교체와 열 수 변경을 섞어서 새 행 목록을 만듭니다
+    rows = [list(r) for r in rows]
+    width = len(rows[0]) if rows else 3
+    for _ in range(rng.randint(0, 6)):
+        op = rng.choice(["insert", "delete", "replace", "widen", "narrow"])
+        if op == "insert":
+            at = rng.randint(0, len(rows))
+            rows[at:at] = random_rows(rng, rng.randint(1, 3), width)
+        elif op == "delete" and rows:
+            at = rng.randrange(len(rows))
+            del rows[at:at + rng.randint(1, 3)]
+        elif op == "replace" and rows:
+            rows[rng.randrange(len(rows))] = random_rows(rng, 1, width)[0]
+        elif op == "widen":
+            width += 1
+            rows = [r + [f"새{rng.randrange(3)}"] for r in rows]
+        elif op == "narrow" and width > 1:
+            width -= 1
+            rows = [r[:width] for r in rows]
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_row_diff_requests_rebuild_new_rows(seed):
+    rng = random.Random(seed)
+    for _ in range(80):
+        old = random_rows(rng, rng.randint(0, 12), rng.randint(1, 4))
+        new = edited(rng, old)
+        sheet = FakeSheet(old)
+        write_sheet_rows(sheet, old, new)
+        assert sheet.values() == trimmed(new)
+        # 변경분만 보내고 전체 덮어쓰기는 하지 않습니다
+        assert "update" not in sheet.calls
+        assert sheet.calls == (["batch_update"] if old != new else [])
+
+
+def test_row_diff_requests_touch_only_changed_rows():
+    old = [["요리명", "필수재료"], ["김치찌개", "김치"], ["라면", "라면"], ["떡볶이", "떡"]]
+    new = [["요리명", "필수재료"], ["김치찌개", "김치, 두부"], ["라면", "라면"], ["떡볶이", "떡"], ["밥", "밥"]]
+    requests = build_row_diff_requests(7, old, new)
+    assert [next(iter(r)) for r in requests] == ["insertDimension", "updateCells", "updateCells"]
+    assert [r["updateCells"]["start"]["rowIndex"] for r in requests if "updateCells" in r] == [4, 1]
+    assert build_row_diff_requests(7, old, old) == []
+
+
+def test_full_rewrite_without_snapshot_clears_leftovers():
+    sheet = FakeSheet(random_rows(random.Random(0), 10, 5), row_count=20, col_count=8)
+    new = [["재료명", "유통기한"], ["김치", ""], ["두부", "2026-01-01"]]
+    write_sheet_rows(sheet, None, new)
+    assert sheet.calls == ["update", "batch_clear"]
+    assert sheet.values() == trimmed(new)
+
+
+def test_full_rewrite_only_after_bad_request():
+    old = [["재료명"], ["김치"]]
+    new = [["재료명"], ["두부"], ["계란"]]
+    # 시트 구조가 달라져 요청이 거절되면(400) 전체를 덮어씁니다
+    sheet = FakeSheet(old)
+    sheet.fail = [ApiError(400)]
+    write_sheet_rows(sheet, old, new)
+    assert sheet.calls == ["batch_update", "update", "batch_clear"]
+    assert sheet.values() == new
+    # 쿼터·서버·네트워크 오류는 덮어쓰지 않고 그대로 올립니다 (재시도는 SheetWriter 몫)
+    for error in (ApiError(429), ApiError(503), ConnectionError("끊김")):
+        sheet = FakeSheet(old)
+        sheet.fail = [error]
+        with pytest.raises(type(error)): write_sheet_rows(sheet, old, new)
+        assert sheet.calls == ["batch_update"]
+        assert sheet.values() == old
+
+
+@pytest.mark.parametrize("error", [ApiError(503), ConnectionError("응답 없음")])
+def test_retry_after_lost_response_does_not_repeat_writes(error):
+    header, rows = ["재료명", "보관장소"], [["김치", "냉장고"], ["두부", "냉장고"]]
+    sheet = FakeSheet([header] + rows)
+    snapshots = {"pantry": [header] + rows}
+    writer, _ = make_writer(sheet, snapshots)
+    # 행 삽입은 반영됐는데 응답을 못 받은 경우: 다시 읽은 시트 기준으로는 보낼 변경분이 없습니다
+    sheet.lost = [error]
+    frame = [header, ["계란", "실온"]] + rows
+    writer.save(frame, "pantry")
+    assert writer.flush(5)
+    assert sheet.calls == ["batch_update", "get_all_records"]
+    assert sheet.values() == frame
+    # 행 추가도 시트 끝에 이미 붙어 있으면 다시 붙이지 않습니다
+    sheet.calls, sheet.lost = [], [error]
+    writer.append(["스팸", "실온"], "pantry")
+    assert writer.flush(5)
+    assert sheet.calls == ["append_rows", "get_all_records"]
+    assert sheet.values() == frame + [["스팸", "실온"]]
+    assert snapshots["pantry"] == frame + [["스팸", "실온"]]
+    assert writer.take_errors() == []
+
+
+def test_retry_after_rejected_or_unsent_write_sends_it_again():
+    header = ["재료명"]
+    sheet = FakeSheet([header, ["김치"]])
+    writer, delays = make_writer(sheet, {"pantry": [header, ["김치"]]})
+    # 429는 거절된 요청이라 다시 읽지 않고, 반영 전에 끊긴 연결은 다시 읽은 뒤 이어서 보냅니다
+    sheet.fail = [ApiError(429), ConnectionError("끊김")]
+    writer.append(["두부"], "pantry")
+    assert writer.flush(5)
+    assert sheet.calls == ["append_rows", "append_rows", "get_all_records", "append_rows"]
+    assert sheet.values() == [header, ["김치"], ["두부"]]
+    assert len(delays) == 2
+
+
+def test_writes_coalesce_while_one_is_in_flight():
+    header = ["재료명", "보관장소"]
+    sheet = FakeSheet([header, ["김치", "냉장고"]])
+    snapshots = {"pantry": [header, ["김치", "냉장고"]]}
+    applied = []
+    writer, _ = make_writer(sheet, snapshots, on_applied=lambda tab, ok: applied.append((tab, ok)))
+    sheet.gate.clear()
+    first = [header, ["두부", "냉장고"]]
+    writer.save(first, "pantry")
+    assert sheet.entered.wait(5)
+    # 시트에 들어가는 중인 쓰기도 화면에는 바로 보입니다
+    assert writer.overlay("pantry", header).values.tolist() == first[1:]
+    assert not writer.flush(0.05)
+    # 그동안 쌓인 저장은 마지막 것 하나로, 행 추가는 한 번의 append_rows로 합칩니다
+    writer.save([header, ["계란", "실온"]], "pantry")
+    last = [header, ["계란", "실온"], ["스팸", "실온"]]
+    writer.save(last, "pantry")
+    writer.append(["라면", "실온"], "pantry")
+    writer.append(["햇반", "실온"], "pantry")
+    assert writer.overlay("pantry", header).values.tolist() == last[1:] + [["라면", "실온"], ["햇반", "실온"]]
+    assert writer.generation("pantry") == 5
+    sheet.gate.set()
+    assert writer.flush(5)
+    assert sheet.calls == ["batch_update", "batch_update", "append_rows"]
+    assert sheet.values() == last + [["라면", "실온"], ["햇반", "실온"]]
+    assert snapshots["pantry"] == last + [["라면", "실온"], ["햇반", "실온"]]
+    assert writer.overlay("pantry", header).values.tolist() == last[1:] + [["라면", "실온"], ["햇반", "실온"]]
+    assert applied == [("pantry", True), ("pantry", True)]
+    assert writer.take_errors() == []
+
+
+def test_backoff_then_report_final_error():
+    header = ["재료명"]
+    sheet = FakeSheet([header, ["김치"]])
+    applied = []
+    writer, delays = make_writer(sheet, {"pantry": [header, ["김치"]]}, on_applied=lambda tab, ok: applied.append((tab, ok)))
+    sheet.fail = [ApiError(429)] * SheetWriter.MAX_RETRIES
+    writer.append(["두부"], "pantry")
+    assert writer.flush(5)
+    # 1초부터 두 배씩 늘리고 절반까지 흔들어 줍니다 (마지막 실패 뒤에는 쉬지 않음)
+    assert len(delays) == SheetWriter.MAX_RETRIES - 1
+    for attempt, delay in enumerate(delays):
+        assert 2 ** attempt <= delay <= 1.5 * 2 ** attempt
+    assert sheet.calls == ["append_rows"] * SheetWriter.MAX_RETRIES
+    assert writer.connection.invalidated == ["pantry"] * SheetWriter.MAX_RETRIES
+    assert sheet.values() == [header, ["김치"]]
+    assert applied == [("pantry", False)]
+    assert writer.take_errors() == ["pantry: HTTP 429"]
+    assert writer.take_errors() == []
+    # 실패한 쓰기는 대기 목록에 남지 않고, 다음 쓰기는 정상으로 나갑니다
+    writer.append(["계란"], "pantry")
+    assert writer.flush(5)
+    assert sheet.values() == [header, ["김치"], ["계란"]]
+    assert applied[-1] == ("pantry", True)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubClient:
+    # gspread 클라이언트 → 스프레드시트 → 워크시트 순으로 여는 횟수를 셉니다
+    def __init__(self, log):
+        self.log = log
+
+    def open(self, name):
+        self.log.append(("open", name))
+        time.sleep(0.01)
+        return self
+
+    def worksheet(self, tab_name):
+        self.log.append(("worksheet", tab_name))
+        return (self, tab_name)
+
+    def get_lastUpdateTime(self):
+        return "2026-01-01T00:00:00Z"
+
+
+def make_connection(clock=None):
+    log = []
+
+    def client_factory():
+        log.append(("auth",))
+        time.sleep(0.01)
+        return StubClient(log)
+    return SheetConnection(client_factory, token_ttl=60, clock=clock or Clock()), log
+
+
+def test_connection_authorizes_and_opens_once_under_concurrency():
+    connection, log = make_connection()
+    start = threading.Barrier(8)
+    found = []
+
+    def work():
+        start.wait()
+        found.append(connection.worksheet("pantry"))
+        connection.revision()
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join(5)
+    assert len(found) == 8 and all(ws is found[0] for ws in found)
+    assert log == [("auth",), ("open", "cooking_db"), ("worksheet", "pantry")]
+
+
+def test_connection_reauthorizes_after_token_ttl():
+    clock = Clock()
+    connection, log = make_connection(clock)
+    first = connection.worksheet("pantry")
+    clock.now += 59
+    assert connection.worksheet("pantry") is first
+    assert log.count(("auth",)) == 1
+    # 토큰 수명이 지나면 다시 인증하고 스프레드시트·워크시트 핸들도 새로 엽니다
+    clock.now += 1
+    assert connection.worksheet("pantry") is not first
+    assert log == [("auth",), ("open", "cooking_db"), ("worksheet", "pantry")] * 2
+
+
+def test_invalidate_tab_reopens_only_that_tab():
+    connection, log = make_connection()
+    pantry, recipes = connection.worksheet("pantry"), connection.worksheet("recipes")
+    log.clear()
+    connection.invalidate("pantry")
+    assert connection.worksheet("recipes") is recipes
+    assert connection.worksheet("pantry") is not pantry
+    assert log == [("worksheet", "pantry")]
+    # 탭을 지정하지 않으면 인증부터 다시 합니다
+    log.clear()
+    connection.invalidate()
+    connection.worksheet("recipes")
+    assert log == [("auth",), ("open", "cooking_db"), ("worksheet", "recipes")]
+
+
+class RemoteSheets:
+    # TabCache용 연결: 수정 시각 확인과 탭 읽기를 세고, offline이면 둘 다 실패합니다
+    def __init__(self, tabs):
+        self.tabs = tabs
+        self.modified = "v1"
+        self.offline = False
+        self.gate = threading.Event()
+        self.gate.set()
+        self.calls = []
+
+    def revision(self):
+        self.calls.append("revision")
+        assert self.gate.wait(5)
+        if self.offline: raise ConnectionError("오프라인")
+        return self.modified
+
+    def worksheet(self, tab_name):
+        self.calls.append("worksheet")
+        assert self.gate.wait(5)
+        if self.offline: raise ConnectionError("오프라인")
+        return FakeSheet(self.tabs[tab_name])
+
+    def invalidate(self, tab_name=None):
+        pass
+
+
+def test_tab_cache_backs_off_while_offline(tmp_path):
+    remote = RemoteSheets({"pantry": [["재료명"], ["김치"]]})
+    clock = Clock()
+    TabCache(remote, cache_dir=str(tmp_path), clock=clock).read("pantry")
+    # 디스크 스냅샷으로 다시 시작했는데 시트에 닿지 않는 경우
+    remote.offline, remote.calls = True, []
+    cache = TabCache(remote, cache_dir=str(tmp_path), check_interval=30, clock=clock)
+    assert cache.read("pantry") == [["재료명"], ["김치"]]
+    clock.now += 29
+    assert cache.read("pantry") == [["재료명"], ["김치"]]
+    assert remote.calls == ["revision"]
+    clock.now += 1
+    cache.read("pantry")
+    assert remote.calls == ["revision"] * 2
+    # 다시 연결되면 다음 확인에서 새 내용을 받아 옵니다
+    remote.offline, remote.modified = False, "v2"
+    remote.tabs["pantry"] = [["재료명"], ["두부"]]
+    clock.now += 30
+    assert cache.read("pantry") == [["재료명"], ["두부"]]
+    assert cache.version("pantry") == 2
+
+
+def test_tab_cache_does_not_hold_lock_during_network_calls():
+    remote = RemoteSheets({"pantry": [["재료명"], ["김치"]], "recipes": [["요리명"], ["라면"]]})
+    cache = TabCache(remote, clock=Clock())
+    cache.read("recipes")
+    remote.gate.clear()
+    reader = threading.Thread(target=cache.read, args=("pantry",))
+    calls = len(remote.calls)
+    reader.start()
+    while len(remote.calls) == calls: time.sleep(0.001)
+    # 느린 시트 확인이 진행 중이어도 캐시된 다른 탭 읽기와 쓰기 반영은 기다리지 않습니다
+    assert cache.read("recipes") == [["요리명"], ["라면"]]
+    cache["recipes"] = [["요리명"], ["떡볶이"]]
+    assert cache.version("recipes") == 2
+    remote.gate.set()
+    reader.join(5)
+    assert cache.get("pantry") == [["재료명"], ["김치"]]
+
+
+def test_mark_synced_failure_forces_recheck():
+    remote = RemoteSheets({"pantry": [["재료명"], ["김치"]]})
+    cache = TabCache(remote, clock=Clock())
+    cache.read("pantry")
+    cache["pantry"] = [["재료명"], ["김치"], ["두부"]]
+    remote.calls = []
+    cache.mark_synced("pantry", ok=False)
+    assert remote.calls == []
+    # 쓰기가 실패했으니 시트에 실제로 있는 내용으로 되돌아갑니다
+    assert cache.read("pantry") == [["재료명"], ["김치"]]
+    remote.modified = "v2"
+    cache.mark_synced("pantry")
+    assert cache.read("pantry") == [["재료명"], ["김치"]]
+    assert remote.calls == ["worksheet", "revision"]
@@ -0,0 +1,113 @@
+# SimilarityIndex가 직접 계산한 TF-IDF 코사인 유사도와 같은 답을 내는지 확인
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import recipe_engine
+from recipe_engine import PORK_EQUIVALENTS, RecipeIndex, normalize_pantry, recipe_tokens
+
+MAINS = ["김치", "두부", "계란", "스팸", "참치캔", "애호박", "감자", "버섯", "콩나물", "떡", "라면", "밥", "목살", "삼겹살"]
+SEASONINGS = ["대파", "양파", "간장", "고추장", "설탕", "참기름", "소금", "다진마늘"]
+
+
+def random_book(rng, n):
+    book = []
+    for i in range(n):
+        items = rng.sample(MAINS, rng.randint(1, 3)) + rng.sample(SEASONINGS, rng.randint(0, 4))
+        book.append({"요리명": f"{items[0]}요리 {i}", "필수재료": ", ".join(f"{x} {rng.randint(1, 3)}개" for x in items), "조리법": ""})
+    return book
+
+
+def tfidf(book):
+    docs = [Counter(t for t in recipe_tokens(r) if t) for r in book]
+    df = Counter(t for d in docs for t in d)
+    idf = {t: math.log((1 + len(book)) / (1 + c)) + 1 for t, c in df.items()}
+    return docs, idf
+
+
+def cosine(a, b):
+    dot = sum(w * b.get(t, 0) for t, w in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def expected_top(book, query, k, excluded=()):
+    docs, idf = tfidf(book)
+    sims = [cosine(query, {t: c * idf[t] for t, c in d.items()}) for i, d in enumerate(docs) if book[i]["요리명"] not in excluded]
+    return sorted((s for s in sims if s > 1e-12), reverse=True)[:k]
+
+
+def recipe_query(book, recipe):
+    _, idf = tfidf(book)
+    n = len(book)
+    return {t: c * idf.get(t, math.log(1 + n) + 1) for t, c in Counter(t for t in recipe_tokens(recipe) if t).items()}
+
+
+def pantry_query(book, pantry):
+    _, idf = tfidf(book)
+    patterns = set(pantry) | (PORK_EQUIVALENTS if "돼지고기" in pantry else set())
+    return {t: w for t, w in idf.items() if any(p in t for p in patterns)}
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_similar_recipes_matches_reference(seed):
+    rng = random.Random(seed)
+    book = random_book(rng, 300)
+    similarity = RecipeIndex(book).similarity()
+    for recipe in rng.sample(book, 30):
+        got = [s for _, s in similarity.similar_recipes(recipe, k=5)]
+        assert got == pytest.approx(expected_top(book, recipe_query(book, recipe), 5, {recipe["요리명"]}))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_similar_to_pantry_matches_reference(seed):
+    rng = random.Random(seed)
+    book = random_book(rng, 300)
+    similarity = RecipeIndex(book).similarity()
+    for _ in range(30):
+        pantry = normalize_pantry(rng.sample(MAINS + ["돼지고기", "파"], rng.randint(1, 6)))
+        got = [s for _, s in similarity.similar_to_pantry(pantry, k=5)]
+        assert got == pytest.approx(expected_top(book, pantry_query(book, pantry), 5))
+
+
+def test_gather_limit_keeps_exact_scores(monkeypatch):
+    # 역색인을 다 읽지 못해도 돌려주는 유사도는 정확한 값이고, 가장 좋은 답보다 높을 수 없습니다
+    monkeypatch.setattr(recipe_engine, "SIMILAR_GATHER", 40)
+    rng = random.Random(7)
+    book = random_book(rng, 500)
+    similarity = RecipeIndex(book).similarity()
+    docs, idf = tfidf(book)
+    for recipe in rng.sample(book, 20):
+        query = recipe_query(book, recipe)
+        found = similarity.similar_recipes(recipe, k=3)
+        assert found
+        for r, score in found:
+            assert score == pytest.approx(cosine(query, {t: c * idf[t] for t, c in docs[book.index(r)].items()}))
+        assert found[0][1] <= expected_top(book, query, 1, {recipe["요리명"]})[0] + 1e-9
+
+
+def test_near_duplicates_finds_renamed_copies():
+    rng = random.Random(3)
+    book = random_book(rng, 400)
+    similarity = RecipeIndex(book).similarity()
+    docs, idf = tfidf(book)
+    for idx in rng.sample(range(len(book)), 30):
+        copy = dict(book[idx], 요리명="이름만 바꾼 복사본")
+        found = similarity.near_duplicates(copy)
+        assert any(r is book[idx] for r, _ in found)
+        # 걸린 것은 모두 기준 이상이고, 고치는 중인 자기 자신은 skip으로 뺄 수 있습니다
+        query = recipe_query(book, copy)
+        for r, score in found:
+            assert score >= recipe_engine.DUPLICATE_SIMILARITY - 1e-9
+            assert score == pytest.approx(cosine(query, {t: c * idf[t] for t, c in docs[book.index(r)].items()}))
+        assert all(r is not book[idx] for r, _ in similarity.near_duplicates(copy, skip={idx}))
+
+
+def test_empty_inputs():
+    similarity = RecipeIndex(random_book(random.Random(0), 20)).similarity()
+    assert similarity.similar_to_pantry({"우주식량"}) == []
+    assert similarity.near_duplicates({"요리명": "빈 레시피", "필수재료": "", "조리법": ""}) == []
+    empty = RecipeIndex([]).similarity()
+    assert empty.similar_recipes({"요리명": "김치찌개", "필수재료": "김치, 두부", "조리법": ""}) == []
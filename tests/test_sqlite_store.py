@@ -0,0 +1,163 @@
+# 로컬 SQLite 저장소: 바뀐 행만 저장, 재료 색인 정리, 중복 제거, CSV 가져오기, 예전 DB 이전, SQL 순위
+import random
+import sqlite3
+
+import pytest
+
+from recipe_engine import PARSED_COLUMNS, RecipeIndex, normalize_pantry, parse_ingredients
+from recipe_storage import PANTRY_COLUMNS, PANTRY_TAB, RECIPE_COLUMNS, RECIPE_TAB, SqliteStore
+
+BASE_COLUMNS = RECIPE_COLUMNS[:4]
+MAINS = ["김치", "두부", "계란", "스팸", "참치캔", "감자", "버섯", "떡", "라면", "밥", "목살", "삼겹살", "돼지고기"]
+SEASONINGS = ["대파", "양파", "간장", "고추장", "설탕", "소금"]
+
+
+def recipe(name, ingredients, link="", steps=""):
+    return [name, ingredients, link, steps]
+
+
+def save_recipes(store, recipes):
+    store.save_rows([BASE_COLUMNS] + [list(r) for r in recipes], RECIPE_TAB)
+
+
+def recipe_ids(store):
+    return {name: rid for rid, name in store.conn.execute('SELECT id, "요리명" FROM recipes')}
+
+
+def indexed(store):
+    # 레시피 id → recipe_ingredient에 들어 있는 정리된 재료 목록
+    found = {}
+    for rid, pos, ingredient in store.conn.execute("SELECT recipe_id, position, ingredient FROM recipe_ingredient ORDER BY recipe_id, position"):
+        found.setdefault(rid, []).append(ingredient)
+    return found
+
+
+@pytest.fixture
+def store():
+    return SqliteStore(":memory:")
+
+
+def test_save_rows_touches_only_changed_rows(store):
+    save_recipes(store, [recipe("김치찌개", "김치, 두부"), recipe("계란말이", "계란 3개, 대파"), recipe("라면", "라면 1봉")])
+    before = recipe_ids(store)
+    # 가운데 행 수정 + 마지막 행 교체는 그 자리(id)를 UPDATE, 늘어난 행만 INSERT 합니다
+    save_recipes(store, [recipe("김치찌개", "김치, 두부"), recipe("계란말이", "계란 3개, 스팸"), recipe("떡볶이", "떡, 고추장"), recipe("밥", "밥")])
+    after = recipe_ids(store)
+    assert after == {"김치찌개": before["김치찌개"], "계란말이": before["계란말이"], "떡볶이": before["라면"], "밥": max(before.values()) + 1}
+    df = store.load(RECIPE_TAB, RECIPE_COLUMNS)
+    assert df[BASE_COLUMNS].values.tolist() == [
+        ["김치찌개", "김치, 두부", "", ""], ["계란말이", "계란 3개, 스팸", "", ""], ["떡볶이", "떡, 고추장", "", ""], ["밥", "밥", "", ""]]
+    # 저장하면서 전처리 열도 채워 둡니다
+    assert all(df["재료토큰"].str.len() > 0)
+    # 같은 내용을 다시 저장하면 아무 행도 쓰지 않습니다
+    changes = store.conn.total_changes
+    save_recipes(store, df[BASE_COLUMNS].values.tolist())
+    assert store.conn.total_changes == changes
+
+
+def test_recipe_ingredient_follows_updates_and_deletes(store):
+    save_recipes(store, [recipe("김치찌개", "김치, 두부"), recipe("계란말이", "계란 3개, 대파"), recipe("라면", "라면 1봉")])
+    ids = recipe_ids(store)
+    # 지운 레시피의 재료 행은 ON DELETE CASCADE로 같이 지워집니다
+    save_recipes(store, [recipe("김치찌개", "김치, 두부"), recipe("라면", "라면 1봉")])
+    assert indexed(store) == {ids["김치찌개"]: ["김치", "두부"], ids["라면"]: ["라면"]}
+    # 고친 레시피는 새 재료로 다시 색인됩니다 (무시 재료 표시 포함)
+    save_recipes(store, [recipe("김치찌개", "김치, 두부"), recipe("라면", "라면 1봉, 계란(풀어서) 1개, 대파")])
+    assert indexed(store) == {ids["김치찌개"]: ["김치", "두부"], ids["라면"]: parse_ingredients("라면 1봉, 계란(풀어서) 1개, 대파")}
+    ignorable = dict(store.conn.execute("SELECT ingredient, ignorable FROM recipe_ingredient WHERE recipe_id = ?", (ids["라면"],)))
+    assert ignorable == {"라면": 0, "계란": 0, "대파": 1}
+    save_recipes(store, [])
+    assert store.conn.execute("SELECT COUNT(*) FROM recipe_ingredient").fetchone()[0] == 0
+
+
+def test_append_indexes_new_recipe(store):
+    store.append(recipe("된장찌개", "된장 1큰술, 두부 1/2모, 애호박"), RECIPE_TAB)
+    assert list(indexed(store).values()) == [["된장", "두부", "애호박"]]
+
+
+def test_dedupe_recipes_keeps_first_of_name_and_link(store):
+    save_recipes(store, [
+        recipe("김치찌개", "김치", "a"), recipe("김치찌개", "김치, 두부", "a"), recipe("김치찌개", "김치", "b"), recipe("라면", "라면", "a")])
+    ids = [rid for rid, in store.conn.execute("SELECT id FROM recipes ORDER BY id")]
+    assert store.dedupe_recipes() == 1
+    df = store.load(RECIPE_TAB, RECIPE_COLUMNS)
+    assert df[["요리명", "필수재료", "링크"]].values.tolist() == [["김치찌개", "김치", "a"], ["김치찌개", "김치", "b"], ["라면", "라면", "a"]]
+    assert store.dedupe_recipes() == 0
+    # 지운 행의 재료 행도 같이 사라지고, 남은 행은 처음 id 그대로입니다
+    assert set(indexed(store)) == {rid for rid, in store.conn.execute("SELECT id FROM recipes")} == {ids[0], ids[2], ids[3]}
+
+
+def test_revision_changes_on_write(store):
+    before = store.revision(RECIPE_TAB)
+    store.append(recipe("라면", "라면"), RECIPE_TAB)
+    assert store.revision(RECIPE_TAB) != before
+    assert store.revision(PANTRY_TAB)[0] == 0
+
+
+def test_import_csv(store, tmp_path):
+    recipes_csv, pantry_csv = tmp_path / "recipes.csv", tmp_path / "pantry.csv"
+    # 열이 빠져 있거나 비어 있어도 빈 문자열로 채워 넣습니다
+    recipes_csv.write_text("요리명,필수재료,링크\n김치찌개,\"김치, 두부\",https://a\n계란말이,계란,\n", encoding="utf-8")
+    pantry_csv.write_text("재료명,유통기한,보관장소\n김치,2026-01-01,냉장고\n간장,,\n", encoding="utf-8")
+    assert store.is_empty()
+    store.import_csv(str(recipes_csv), str(pantry_csv))
+    assert not store.is_empty()
+    recipes = store.load(RECIPE_TAB, RECIPE_COLUMNS)
+    assert recipes[BASE_COLUMNS].values.tolist() == [["김치찌개", "김치, 두부", "https://a", ""], ["계란말이", "계란", "", ""]]
+    assert list(indexed(store).values()) == [["김치", "두부"], ["계란"]]
+    pantry = store.load(PANTRY_TAB, PANTRY_COLUMNS)
+    assert pantry.values.tolist() == [["김치", "2026-01-01", "냉장고"], ["간장", "", ""]]
+
+
+def test_import_csv_skips_missing_files(store, tmp_path):
+    store.import_csv(str(tmp_path / "없음.csv"), str(tmp_path / "없음2.csv"))
+    assert store.is_empty()
+
+
+def test_old_database_gets_parsed_columns(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE recipes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            "요리명" TEXT NOT NULL DEFAULT '', "필수재료" TEXT NOT NULL DEFAULT '', "링크" TEXT NOT NULL DEFAULT '', "조리법" TEXT NOT NULL DEFAULT '');
+        INSERT INTO recipes ("요리명", "필수재료", "링크", "조리법") VALUES ('김치찌개', '김치, 두부', '', '김치를 볶는다. 물을 붓는다.');
+    """)
+    conn.commit()
+    conn.close()
+    store = SqliteStore(path)
+    columns = [row[1] for row in store.conn.execute("PRAGMA table_info(recipes)")]
+    assert all(c in columns for c in PARSED_COLUMNS)
+    df = store.load(RECIPE_TAB, RECIPE_COLUMNS)
+    assert df.values.tolist() == [["김치찌개", "김치, 두부", "", "김치를 볶는다. 물을 붓는다.", "", ""]]
+    # 다시 열어도 열을 또 붙이지 않고, 저장하면 빈 전처리 열이 채워집니다
+    SqliteStore(path)
+    store.save_rows([BASE_COLUMNS] + df[BASE_COLUMNS].values.tolist(), RECIPE_TAB)
+    assert all(store.load(RECIPE_TAB, RECIPE_COLUMNS)[PARSED_COLUMNS].iloc[0] != "")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_top_k_matches_recipe_index(store, seed):
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(300):
+        items = rng.sample(MAINS, rng.randint(1, 3)) + rng.sample(SEASONINGS, rng.randint(0, 3))
+        # 같은 이름이 여러 번 나오도록 이름 종류를 적게 둡니다 (제외 목록과 동점 처리를 같이 확인)
+        recipes.append(recipe(f"{items[0]}요리 {i % 40}", ", ".join(f"{x} {rng.randint(1, 3)}개" for x in items)))
+    save_recipes(store, recipes)
+    index = RecipeIndex(store.load(RECIPE_TAB, RECIPE_COLUMNS).to_dict("records"))
+    for _ in range(40):
+        pantry = normalize_pantry(rng.sample(MAINS + ["파", "없는재료"], rng.randint(0, 5)))
+        excluded = rng.sample(index.names, rng.randint(0, 3))
+        k = rng.randint(1, 8)
+        expected = [(r["요리명"], r["필수재료"], s) for r, s in index.top_k(pantry, k=k, excluded=excluded)]
+        got = [(r["요리명"], r["필수재료"], s) for r, s in store.top_k(pantry, k=k, excluded=excluded)]
+        assert got == expected
+
+
+def test_top_k_sees_new_recipes(store):
+    save_recipes(store, [recipe("김치찌개", "김치, 두부")])
+    assert [r["요리명"] for r, _ in store.top_k({"스팸"})] == ["김치찌개"]
+    store.append(recipe("스팸구이", "스팸"), RECIPE_TAB)
+    best, score = store.top_k({"스팸"})[0]
+    assert (best["요리명"], score) == ("스팸구이", 1)